@@ -16,12 +16,15 @@ setup(
         'colorama',
         'html2text'
     ],
+    extras_require={
+        'async': ['aiohttp'],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "Operating System :: OS Independent",
     ],
     packages=find_packages(include=['stepik', 'stepik.client', 'stepik.models']),
     entry_points={
-        'console_scripts': ['stepik=stepik.__main__:main']
+        'console_scripts': ['stepik=stepik.__main__:run']
     },
 )
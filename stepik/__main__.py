@@ -1,30 +1,52 @@
 #!/usr/bin/env python
+import os
+import sys
 import click
-import html2text
+import importlib
 from pathlib import Path
 
 from . import attempt_cache
-from .course_cache import CourseCache
-from .client import stepikclient
-from .client.auth import auth_user_password
+from . import trace as stepik_trace
+from .client import hedging, mirror, response_cache
 from .client.consts import STEPIK_HOST, GRAND_TYPE_CREDENTIALS
 from .filemanager import FileManager
-from .models.course import Course
-from .models.lesson import Lesson
-from .models.section import Section
 from .models.user import User
-from .navigation import prev_step, next_step, create_course_cache
-from .settings import APP_FOLDER, COURSE_CACHE_FILE, CLIENT_ID, CLIENT_SECRET
+from .settings import APP_FOLDER, CLIENT_ID, CLIENT_SECRET, DAEMON_SOCKET
 from .utils import exit_util
 
+# the API client, the models, and the renderer are only imported by the commands that use them,
+# so that local commands like "current" and "type" start quickly
+
 
 @click.group()
 @click.version_option()
-def main():
+@click.option("--no-cache", is_flag=True, help="Ignore cached responses from the Stepik API.")
+@click.option("--trace", is_flag=True, envvar="STEPIK_TRACE", help="Print how long requests and file I/O took.")
+@click.option(
+    "--trace-file", type=Path, envvar="STEPIK_TRACE_FILE",
+    help="Also write the trace to this file, in the Chrome trace format. Implies --trace."
+)
+@click.option(
+    "--hedge", is_flag=True, envvar="STEPIK_HEDGE",
+    help="Send slow requests twice and use whichever response arrives first."
+)
+@click.pass_context
+def main(ctx, no_cache=False, trace=False, trace_file=None, hedge=False):
     """
     The (unofficial) Stepik CLI for students\n
     A command line tool for submitting solutions to stepik.org
     """
+    # the daemon runs many commands, so these must be reset every time
+    response_cache.enabled = mirror.enabled = not no_cache
+    response_cache.refresh = False
+    hedging.enabled = hedge
+    stepik_trace.stop()
+    if trace or trace_file is not None:
+        stepik_trace.start()
+        # these run in reverse order, so the hedging stats are printed after the trace
+        if hedge:
+            ctx.call_on_close(lambda: click.secho(hedging.format_stats(), err=True))
+        ctx.call_on_close(lambda: stepik_trace.report(trace_file))
     file_manager = FileManager()
     try:
         file_manager.create_dir(APP_FOLDER)
@@ -37,6 +59,8 @@ def auth():
     """
     Authenticate using your OAuth2 credentials.
     """
+    from .client.auth import auth_user_password
+
     click.echo("Enter your registration info from https://stepik.org/oauth2/applications/")
 
     try:
@@ -57,6 +81,47 @@ def auth():
     click.secho("Authentication was successfull!", fg="green", bold=True, err=True)
 
 
+@main.command()
+@click.option("--stop", is_flag=True, help="Stop the daemon that is running.")
+def daemon(stop=False):
+    """
+    Run commands in a background process, to speed them up.\n
+    While the daemon is running, other commands are sent to it instead of starting from scratch.
+    It runs in the foreground, so you may want to start it with "stepik daemon &".
+    """
+    from . import daemon as stepik_daemon
+
+    if stop:
+        if stepik_daemon.stop():
+            click.secho("Stopped the daemon.", fg="green", bold=True, err=True)
+        else:
+            click.secho("The daemon isn't running.", fg="red", bold=True, err=True)
+        return
+    click.secho("Listening for commands...", fg="green", bold=True, err=True)
+    stepik_daemon.serve(main)
+
+
+@main.group()
+def cache():
+    """
+    Manage the cache of responses from the Stepik API.
+    """
+
+
+@cache.command("clear")
+def cache_clear():
+    """
+    Remove every cached response and rendered step.
+    """
+    from . import render_cache
+
+    removed = response_cache.clear()
+    rendered = render_cache.clear()
+    click.secho(
+        "Removed {} cached responses and {} rendered steps.".format(removed, rendered), fg="green", bold=True, err=True
+    )
+
+
 @main.command("step")
 @click.argument("link")
 def step_cmd(link=None):
@@ -64,6 +129,8 @@ def step_cmd(link=None):
     Navigate the current position to the step at the provided URL.
     """
     if link is not None:
+        from .client import stepikclient
+
         user = User()
         stepikclient.set_step(user, link)
 
@@ -71,13 +138,17 @@ def step_cmd(link=None):
 @click.argument("dataset-path", type=Path)
 @click.option("--step_id", help="step id")
 @click.option("--attempt_id", help="attempt id")
-def dataset(dataset_path, step_id=None, attempt_id=None):
+@click.option("--decompress", is_flag=True, help="decompress the dataset if it is gzip or zlib compressed")
+def dataset(dataset_path, step_id=None, attempt_id=None, decompress=False):
     """
-    Attempt a dataset challenge. Writes the downloaded dataset to the provided path.
+    Attempt a dataset challenge. Writes the downloaded dataset to the provided path.\n
+    An interrupted download can be resumed by running the command again with the same --attempt_id.
     """
+    from .client import stepikclient
+
     user = User()
     try:
-        attempt = stepikclient.download_dataset(user, dataset_path, step_id, attempt_id)
+        attempt = stepikclient.download_dataset(user, dataset_path, step_id, attempt_id, decompress)
     except SystemExit:
         # if we exited within the stepikclient, we should just honor that
         raise
@@ -91,16 +162,19 @@ def dataset(dataset_path, step_id=None, attempt_id=None):
 @click.option("-l", help="programming language")
 @click.option("--step-id", help="step id")
 @click.option("--attempt-id", help="attempt id")
-def submit(solution=None, l=None, step_id=None, attempt_id=None):
+@click.option("--deadline", type=click.FLOAT, help="seconds to wait for the verdict")
+def submit(solution=None, l=None, step_id=None, attempt_id=None, deadline=None):
     """
     Submit a solution to stepik. Use the contents of the provided file path.\n
     Specify the programming language via the -l option if your submission is code.\n
     If you are NOT submitting the solution to a dataset challenge, specify "text" to -l
     """
     if solution is not None:
+        from .client import stepikclient
+
         user = User()
         try:
-            stepikclient.submit_code(user, solution, l, step_id, attempt_id)
+            stepikclient.submit_code(user, solution, l, step_id, attempt_id, deadline)
         except SystemExit:
             # if we exited within the stepikclient, we should just honor that
             raise
@@ -108,12 +182,36 @@ def submit(solution=None, l=None, step_id=None, attempt_id=None):
             exit_util("Unable to submit solution. There was some sort of error.")
 
 
+@main.command("submit-batch")
+@click.argument("manifest", type=Path)
+@click.option("--workers", type=click.IntRange(1), default=4, show_default=True, help="submissions to send at once")
+@click.option("--deadline", type=click.FLOAT, help="seconds to wait for the verdicts")
+@click.option("--json", "as_json", is_flag=True, help="output the results as JSON instead of a tab-separated table")
+def submit_batch(manifest, workers=4, deadline=None, as_json=False):
+    """
+    Submit many solutions at once, as listed in a JSON manifest.\n
+    The manifest maps each solution file to a step ID, or to a step position within a lesson:\n
+        {"lesson": 9172, "language": "python3", "submissions": [{"file": "a.py", "step": 2}]}\n
+    Leave out "lesson" to give step IDs instead. Leave out "language" to submit to dataset challenges.
+    """
+    from .client import batch
+
+    user = User()
+    entries = batch.read_manifest(user, manifest)
+    results = batch.submit_batch(user, entries, workers, deadline)
+    click.echo(batch.format_results(results, as_json))
+    if any(entry['status'] != 'correct' for entry in results):
+        sys.exit(2)
+
+
 @main.command()
 def lang():
     """
     Lists the available programming languages for the current step.\n
     Assumes the current step has a coding challenge.
     """
+    from .client import stepikclient
+
     user = User()
     current_step_id = attempt_cache.get_step_id()
     languages = stepikclient.get_languages_list(user, current_step_id)
@@ -122,14 +220,20 @@ def lang():
 
 
 @main.command("next")
-def next_cmd():
+@click.option(
+    "--prefetch", is_flag=True, envvar="STEPIK_PREFETCH",
+    help="Fetch the following steps in the background, so that viewing them is quick."
+)
+def next_cmd(prefetch=False):
     """
     Navigate to the next step in a course.\n
     For the best navigation experience, you should set the course using the "course" command before using this command.\n
     Steps will be filtered according to the current step type. You can use the "type" command to change this.
     """
+    from .navigation import next_step
+
     user = User()
-    if next_step(user, user.step_type):
+    if next_step(user, user.step_type, prefetch):
         current_lesson = attempt_cache.get_lesson_id()
         current_pos = attempt_cache.get_current_position()
         message = "Switched to lesson {}, step {}".format(current_lesson, current_pos)
@@ -143,14 +247,20 @@ def next_cmd():
 
 
 @main.command()
-def prev():
+@click.option(
+    "--prefetch", is_flag=True, envvar="STEPIK_PREFETCH",
+    help="Fetch the following steps in the background, so that viewing them is quick."
+)
+def prev(prefetch=False):
     """
     Navigate to the previous step in a course.\n
     For the best navigation experience, you should set the course using the "course" command before using this command.\n
     Steps will be filtered according to the current step type. You can use the "type" command to change this.
     """
+    from .navigation import prev_step
+
     user = User()
-    if prev_step(user, user.step_type):
+    if prev_step(user, user.step_type, prefetch):
         current_lesson = attempt_cache.get_lesson_id()
         current_pos = attempt_cache.get_current_position()
         message = "Switched to lesson {}, step {}".format(current_lesson, current_pos)
@@ -197,20 +307,32 @@ def current():
 
 
 @main.command()
-def text():
+@click.option("--prerender", is_flag=True, help="Also render the other steps in this lesson, so they display quickly.")
+def text(prerender=False):
     """
     Display the contents of the current step.
     """
+    from . import render_cache
+    from .client import stepikclient
+
     user = User()
 
-    step_id = attempt_cache.get_step_id()
+    data = attempt_cache.get_data()
+    step_id = attempt_cache.get_step_id(data)
     if step_id is None:
         exit_util("You should first set the current step using the 'step' command.")
 
     step = stepikclient.get_step(user, step_id)
 
-    html = step['steps'][0]['block']['text']
-    click.secho(html2text.html2text(html))
+    click.secho(render_cache.render('step', step_id, step['steps'][0]['block']['text']))
+
+    if prerender:
+        from .models.lesson import Lesson
+
+        # after the current step is displayed, so that it doesn't wait for the others
+        sys.stdout.flush()
+        lesson = Lesson(user, {'id': data['lesson_id'], 'steps': [s for s in data['steps'] if s != step_id]})
+        render_cache.prerender('step', [(step.id, step.block['text']) for step in lesson.items()])
 
 
 @main.command()
@@ -218,8 +340,11 @@ def courses():
     """
     Display a list of your enrolled courses and their course IDs.
     """
-    courses_set = "\n".join(map(str, Course.all()))
-    click.secho(courses_set)
+    from .models.course import Course
+
+    # print each course as soon as it arrives
+    for course in Course.iter_all():
+        click.secho(str(course))
 
 
 def validate_id(ctx, param, value):
@@ -242,7 +367,15 @@ def course_cmd(course_id, recache=False):
     Switch to the course that has the provided course ID.\n
     Cache the course for navigation purposes and display a description of the course.
     """
+    from . import render_cache
+    from .models.course import Course
+    from .navigation import create_course_cache
+
     user = User()
+    if recache:
+        # the course's list of sections (and everything else) might be out of date in the cache or the mirror
+        response_cache.refresh = True
+        mirror.enabled = False
     course = Course.get(user, course_id)
     click.secho(str(course), bold=True)
 
@@ -255,16 +388,44 @@ def course_cmd(course_id, recache=False):
             " this course, this may take a minute."
         ), fg='white', bold=True, err=True)
         try:
-            cache.update()
+            requests_used = cache.update()
         except:
             exit_util("Unable to cache course. Do you have permission to view it?")
         if not cache.load(user):
             exit_util("Something went wrong. We were unable to cache this course.")
+        click.secho(
+            "Cached {} lessons using {} requests.".format(len(cache.data['lessons']), requests_used),
+            fg='green', err=True
+        )
+
+    click.secho(render_cache.render('course', course.id, course.description))
+
+
+@main.command()
+@click.argument("course_id", type=click.INT, callback=validate_id)
+def sync(course_id):
+    """
+    Download a course, so that it can be read offline.\n
+    Its sections, lessons, and steps are stored on disk, and other commands use them instead of the Stepik API.
+    Run this command again to download only the lessons that have changed since.
+    """
+    from .client.sync import sync as sync_course
 
-    click.secho(html2text.html2text(course.description))
+    user = User()
+    written, requests_used = sync_course(user, course_id)
+    click.secho(
+        "Synced course {}: updated {} sections, {} lessons, and {} steps using {} requests.".format(
+            course_id, written['sections'], written['lessons'], written['steps'], requests_used
+        ), fg='green', bold=True, err=True
+    )
 
 
-_ENTITIES = {'course': Course, 'section': Section, 'lesson': Lesson}
+# the module and class of each entity, imported when it is needed
+_ENTITIES = {
+    'course': ('.models.course', 'Course'),
+    'section': ('.models.section', 'Section'),
+    'lesson': ('.models.lesson', 'Lesson'),
+}
 
 
 def validate_entity(ctx, param, value):
@@ -290,10 +451,28 @@ def content_cmd(entity, entity_id):
 
     user = User()
 
-    entity_class = _ENTITIES[entity]
+    module, class_name = _ENTITIES[entity]
+    entity_class = getattr(importlib.import_module(module, __package__), class_name)
 
     entity = entity_class.get(user, entity_id)
 
     click.secho(str(entity), bold=True)
-    items = "\n".join(map(str, entity.items()))
-    click.secho(items)
+    # print each item as soon as it arrives
+    for item in entity.iter_items():
+        click.secho(str(item))
+
+
+def run():
+    """the entry point of the CLI: run the command in the daemon if it's running, or in this process otherwise"""
+    exit_code = None
+    # the daemon module is only imported if the daemon might be running
+    if os.path.exists(DAEMON_SOCKET):
+        from .daemon import forward
+        exit_code = forward(main, sys.argv[1:])
+    if exit_code is None:
+        main(prog_name='stepik')
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    run()
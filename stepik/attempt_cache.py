@@ -1,31 +1,171 @@
+import os
+import json
 import datetime
+import threading
 
-from .settings import ATTEMPT_FILE
+from .settings import ATTEMPT_FILE, STATE_DB, ATTEMPT_RETENTION
 from .client.attempt import Attempt
 from .filemanager import FileManager
 
 _file_manager = FileManager()
+_lock = threading.RLock()
+_db = None
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS position (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    lesson_id TEXT,
+    current_position INTEGER,
+    steps TEXT
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    step_id INTEGER PRIMARY KEY,
+    id INTEGER NOT NULL,
+    start_time TEXT NOT NULL,
+    due TEXT NOT NULL,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS attempts_due ON attempts (due);
+"""
+
+
+class _Transaction:
+    """hold the lock and an immediate (write) transaction on the database"""
+
+    def __enter__(self):
+        _lock.acquire()
+        try:
+            self.db = _connect()
+            self.db.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            _lock.release()
+            raise
+        return self.db
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            _lock.release()
+
+
+def _connect():
+    global _db
+    if _db is None:
+        # imported here, since it's slow to import and not every command needs it
+        import sqlite3
+
+        with _lock:
+            if _db is None:
+                new = not os.path.exists(STATE_DB)
+                db = sqlite3.connect(STATE_DB, timeout=10, isolation_level=None, check_same_thread=False)
+                db.executescript(_SCHEMA)
+                _db = db
+                if new:
+                    _migrate()
+    return _db
+
+
+def _migrate():
+    """import the JSON file that older versions used to store the state in"""
+    try:
+        data = _file_manager.read_json(ATTEMPT_FILE)
+    except (FileNotFoundError, ValueError):
+        return
+    set_data(data)
+    os.replace(ATTEMPT_FILE, ATTEMPT_FILE + ".migrated")
+
+
+def _prune(db):
+    """
+    forget about attempts that expired a while ago
+    it's done whenever attempts are written, so that commands that only read don't need a write transaction
+    """
+    oldest = datetime.datetime.now() - datetime.timedelta(seconds=ATTEMPT_RETENTION)
+    db.execute("DELETE FROM attempts WHERE due < ?", (str(oldest),))
+
+
+def _query(sql, parameters=()):
+    with _lock:
+        return _connect().execute(sql, parameters).fetchall()
+
+
+def _position_data(row):
+    data = {}
+    if row is None:
+        return data
+    lesson_id, current_position, steps = row
+    if lesson_id is not None:
+        data['lesson_id'] = json.loads(lesson_id)
+    if current_position is not None:
+        data['current_position'] = current_position
+    if steps is not None:
+        data['steps'] = json.loads(steps)
+    return data
+
+
+def _get_position():
+    rows = _query("SELECT lesson_id, current_position, steps FROM position WHERE id = 0")
+    return _position_data(rows[0] if rows else None)
 
 
 def clear():
-    set_data({})
+    with _Transaction() as db:
+        db.execute("DELETE FROM position")
+        db.execute("DELETE FROM attempts")
 
 
 def get_data():
-    try:
-        return _file_manager.read_json(ATTEMPT_FILE)
-    except FileNotFoundError:
-        clear()
-        return {}
+    data = _get_position()
+    data['attempts'] = {
+        str(step_id): {'id': attempt_id, 'start_time': start_time, 'due': due, 'step_id': step_id, 'status': status}
+        for attempt_id, start_time, due, step_id, status in _query(
+            "SELECT id, start_time, due, step_id, status FROM attempts"
+        )
+    }
+    return data
+
+
+def _write_position(db, data):
+    db.execute(
+        "INSERT OR REPLACE INTO position (id, lesson_id, current_position, steps) VALUES (0, ?, ?, ?)", (
+            json.dumps(data['lesson_id']) if 'lesson_id' in data else None,
+            data.get('current_position'),
+            json.dumps(data['steps']) if 'steps' in data else None,
+        )
+    )
+
+
+def _write_attempt(db, attempt):
+    db.execute(
+        "INSERT OR REPLACE INTO attempts (step_id, id, start_time, due, status) VALUES (?, ?, ?, ?, ?)", (
+            int(attempt['step_id']), int(attempt['id']), str(attempt['start_time']),
+            str(attempt['due']), attempt['status']
+        )
+    )
 
 
 def set_data(data):
-    _file_manager.write_json(ATTEMPT_FILE, data)
+    """store the position and any attempts in the data, all at once"""
+    with _Transaction() as db:
+        _write_position(db, data)
+        for attempt in data.get('attempts', {}).values():
+            _write_attempt(db, attempt)
+        _prune(db)
+
+
+def set_position(**fields):
+    """atomically update some of lesson_id, current_position, and steps"""
+    with _Transaction() as db:
+        rows = db.execute("SELECT lesson_id, current_position, steps FROM position WHERE id = 0").fetchall()
+        data = _position_data(rows[0] if rows else None)
+        data.update(fields)
+        _write_position(db, data)
 
 
 def get_step_id(data=None):
     if data is None:
-        data = get_data()
+        data = _get_position()
     try:
         position = data['current_position']
         return data['steps'][position - 1]
@@ -34,17 +174,19 @@ def get_step_id(data=None):
 
 
 def set_attempt(attempt, data=None):
-    if data is None:
-        data = get_data()
-    if 'attempts' not in data:
-        data['attempts'] = {}
-    data['attempts'][str(attempt.step_id)] = attempt.json()
-    set_data(data)
+    if data is not None:
+        data.setdefault('attempts', {})[str(attempt.step_id)] = attempt.json()
+    with _Transaction() as db:
+        _write_attempt(db, attempt.json())
+        _prune(db)
 
 
 def get_attempt(step_id, data=None):
     if data is None:
-        data = get_data()
+        rows = _query("SELECT id, start_time, due, step_id, status FROM attempts WHERE step_id = ?", (int(step_id),))
+        if not rows:
+            raise KeyError(str(step_id))
+        return Attempt(*rows[0])
     attempt = data['attempts'][str(step_id)]
     return Attempt(
         int(attempt['id']), attempt['start_time'], attempt['due'],
@@ -53,14 +195,12 @@ def get_attempt(step_id, data=None):
 
 
 def set_lesson_id(lesson_id):
-    data = get_data()
-    data['lesson_id'] = lesson_id
-    set_data(data)
+    set_position(lesson_id=lesson_id)
 
 
 def get_lesson_id(data=None):
     if data is None:
-        data = get_data()
+        data = _get_position()
     try:
         return data['lesson_id']
     except KeyError:
@@ -69,7 +209,7 @@ def get_lesson_id(data=None):
 
 def get_current_position(data=None):
     if data is None:
-        data = get_data()
+        data = _get_position()
     try:
         return data['current_position']
     except KeyError:
@@ -0,0 +1,172 @@
+"""
+An asyncio counterpart to stepikclient, for bulk tools that fetch thousands of entities
+It requires aiohttp, which can be installed with: pip install 'stepik-cli[async]'
+"""
+import json
+import asyncio
+
+from .auth import get_headers
+from .consts import LESSONS_PK, SUBMISSIONS, SUBMISSIONS_PK, STEPS_PK, COURSES, COURSES_PK, ATTEMPTS, \
+    SECTIONS, SECTIONS_PK, UNITS, LESSONS, STEPS, STEPIK_API_URL
+from .encoder import encode_submission
+from ..settings import POOL_SIZE, REQUEST_TIMEOUT, DOWNLOAD_CHUNK_SIZE
+from ..utils import prepare_ids, BATCH_SIZE
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+async def gather(coroutines):
+    """run the coroutines concurrently. if one of them fails, the others are cancelled"""
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+class AsyncStepikClient:
+    """
+    Makes requests to the Stepik API with at most `limit` connections at once
+    Use it as an async context manager, so that its connections are closed when you're done
+    """
+
+    def __init__(self, user, limit=POOL_SIZE, timeout=REQUEST_TIMEOUT):
+        if aiohttp is None:
+            raise ImportError("The asyncio client requires aiohttp. Install it with: pip install 'stepik-cli[async]'")
+        self.user = user
+        self.limit = limit
+        self.timeout = timeout
+        self._session = None
+        self._headers = None
+
+    async def __aenter__(self):
+        # renewing an expired token is a blocking request, so it's done once, before any other request,
+        # in a thread, rather than by every request in the event loop
+        self._headers = await asyncio.get_event_loop().run_in_executor(None, get_headers, self.user)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.limit),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={'Accept': 'application/json'}
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def request(self, method, url, **kwargs):
+        """make a request and return its JSON. raise an aiohttp.ClientResponseError if it fails"""
+        async with self._session.request(method, url, headers=self._headers, **kwargs) as resp:
+            resp.raise_for_status()
+            return await resp.json(content_type=None)
+
+    async def get_entity(self, entity_id, url_template):
+        return await self.request("GET", url_template.format(entity_id))
+
+    async def get_course(self, course_id):
+        return await self.get_entity(course_id, COURSES_PK)
+
+    async def get_section(self, section_id):
+        return await self.get_entity(section_id, SECTIONS_PK)
+
+    async def get_lesson(self, lesson_id):
+        return await self.get_entity(lesson_id, LESSONS_PK)
+
+    async def get_step(self, step_id):
+        return await self.get_entity(step_id, STEPS_PK)
+
+    async def get_submission(self, submission_id):
+        return await self.get_entity(submission_id, SUBMISSIONS_PK)
+
+    async def get_entities_with_ids(self, ids, page, url):
+        return await self.request("GET", url + "?" + prepare_ids(ids) + '&page=' + str(page))
+
+    async def load_pages(self, ids, url):
+        """fetch every page of the entities with these ids. after the first page, the rest are fetched at once"""
+        first = await self.get_entities_with_ids(ids, 1, url)
+        pages = [first]
+        if not first['meta']['has_next']:
+            return pages
+        items = next(value for key, value in first.items() if key != 'meta')
+        # we know how many ids we asked for, so we know how many pages to expect
+        last_page = -(-len(ids) // max(len(items), 1))
+        pages.extend(await gather(
+            self.get_entities_with_ids(ids, page, url) for page in range(2, last_page + 1)
+        ))
+        while pages[-1]['meta']['has_next']:
+            pages.append(await self.get_entities_with_ids(ids, len(pages) + 1, url))
+        return pages
+
+    async def load_entities(self, ids, url, key, batch_size=BATCH_SIZE):
+        """fetch the entities with these ids in concurrent ids[] batches. return their JSON in the order of the ids"""
+        unique_ids = list(dict.fromkeys(ids))
+        batches = await gather(
+            self.load_pages(unique_ids[start:start+batch_size], url)
+            for start in range(0, len(unique_ids), batch_size)
+        )
+        loaded = {entity['id']: entity for pages in batches for page in pages for entity in page[key]}
+        return [loaded[entity_id] for entity_id in ids if entity_id in loaded]
+
+    async def get_sections(self, ids):
+        return await self.load_entities(ids, SECTIONS, 'sections')
+
+    async def get_units(self, ids):
+        return await self.load_entities(ids, UNITS, 'units')
+
+    async def get_lessons(self, ids):
+        return await self.load_entities(ids, LESSONS, 'lessons')
+
+    async def get_steps(self, ids):
+        return await self.load_entities(ids, STEPS, 'steps')
+
+    async def get_courses(self, **params):
+        """fetch every page of courses matching the params (ex: enrolled='true')"""
+        courses = []
+        page, has_next = 1, True
+        while has_next:
+            resp = await self.request("GET", COURSES, params=dict(params, page=page))
+            courses.extend(resp['courses'])
+            has_next = resp['meta']['has_next']
+            page += 1
+        return courses
+
+    async def create_attempt(self, step_id):
+        data = json.dumps({"attempt": {"step": str(step_id)}})
+        resp = await self.request("POST", ATTEMPTS, data=data)
+        return resp['attempts'][0]
+
+    async def post_submission(self, submission):
+        """post a submission (ex: from stepikclient.prepare_submission). return its ID"""
+        body, _ = encode_submission(submission)
+        submission_url = SUBMISSIONS[:-1] if SUBMISSIONS.endswith('/') else SUBMISSIONS
+        resp = await self.request(
+            "POST", submission_url + "?attempt={}".format(submission['submission']['attempt']), data=body
+        )
+        return resp['submissions'][-1]['id']
+
+    async def get_submissions(self, ids):
+        submission_url = SUBMISSIONS[:-1] if SUBMISSIONS.endswith('/') else SUBMISSIONS
+        resp = await self.request("GET", submission_url + "?" + prepare_ids(ids))
+        return resp['submissions']
+
+    async def download_dataset(self, dataset_url, filename):
+        """stream a dataset to a file. return the number of bytes written"""
+        if dataset_url.startswith('/api'):
+            dataset_url = dataset_url[len('/api'):]
+        size = 0
+        async with self._session.get(STEPIK_API_URL + dataset_url, headers=self._headers) as resp:
+            resp.raise_for_status()
+            with open(str(filename), "wb") as file:
+                async for chunk in resp.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    size += file.write(chunk)
+        return size
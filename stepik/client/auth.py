@@ -1,6 +1,9 @@
 import requests
 import datetime
 
+from .consts import OAUTH_TOKEN
+from .session import get_session
+from .token_manager import ensure_token
 from ..utils import exit_util
 
 
@@ -13,11 +16,11 @@ def auth_user_password(user, password=None):
                     'secret_id': user.secret,
                     'username': user.username,
                     'password': password}
-            resp = requests.post('https://stepik.org/oauth2/token/', data)
+            resp = get_session().post(OAUTH_TOKEN, data)
         else:
             auth = requests.auth.HTTPBasicAuth(user.client_id, user.secret)
             data = {'grant_type': user.grand_type}
-            resp = requests.post('https://stepik.org/oauth2/token/', data, auth=auth)
+            resp = get_session().post(OAUTH_TOKEN, data, auth=auth)
 
         assert resp.status_code < 300
 
@@ -33,6 +36,7 @@ def auth_user_password(user, password=None):
 
 
 def get_headers(user):
+    ensure_token(user)
     return {'Authorization': 'Bearer ' + user.access_token, "content-type": "application/json"}
 
 
@@ -43,12 +47,15 @@ def refresh_client(user):
                 'secret_id': user.secret,
                 'refresh_token': user.refresh_token}
 
-        resp = requests.post('https://stepik.org/oauth2/token/', data)
+        resp = get_session().post(OAUTH_TOKEN, data)
 
         assert resp.status_code < 300
 
-        user.access_token = (resp.json())['access_token']
-        user.refresh_token = (resp.json())['refresh_token']
+        resp = resp.json()
+        user.access_token = resp['access_token']
+        user.refresh_token = resp['refresh_token']
+        if 'expires_in' in resp:
+            user.expiration = datetime.datetime.now() + datetime.timedelta(seconds=int(resp['expires_in']))
         user.save()
     except AssertionError:
         return False
@@ -0,0 +1,100 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from . import stepikclient
+from ..filemanager import FileManager
+from ..utils import ExitError, exit_util, raise_errors
+
+# the columns of the results table
+FIELDS = ('file', 'step', 'attempt', 'submission', 'status', 'seconds', 'message')
+
+
+def read_manifest(user, manifest_path):
+    """
+    read a manifest of the solutions to submit. It should be a JSON object like
+    {"lesson": 9172, "language": "python3", "submissions": [{"file": "a.py", "step": 2, "language": "python3"}]}
+    If "lesson" is provided, each "step" is a position within that lesson. Otherwise, it is a step ID.
+    "language" is optional at either level. Leave it out to submit to a dataset challenge.
+    return a list of entries with "file", "step" (a step ID), and "language"
+    """
+    try:
+        manifest = FileManager().read_json(manifest_path)
+    except FileNotFoundError:
+        exit_util("File {} not found".format(manifest_path))
+    except ValueError:
+        exit_util("The manifest {} is not valid JSON.".format(manifest_path))
+    steps = None
+    if manifest.get('lesson') is not None:
+        lesson = stepikclient.get_lesson(user, manifest['lesson'])
+        steps = lesson['lessons'][0]['steps']
+    entries = []
+    for item in manifest.get('submissions', []):
+        step = int(item['step'])
+        if steps is not None:
+            if not 1 <= step <= len(steps):
+                exit_util("Lesson {} doesn't have a step {}.".format(manifest['lesson'], step))
+            step = steps[step - 1]
+        entries.append({
+            'file': item['file'], 'step': step,
+            'language': item.get('language', manifest.get('language'))
+        })
+    return entries
+
+
+def _send(user, entry):
+    """prepare and post one submission, recording the outcome in the entry"""
+    try:
+        with raise_errors():
+            submission = stepikclient.prepare_submission(
+                user, entry['file'], entry['language'], entry['step']
+            )
+            entry['attempt'] = submission['submission']['attempt']
+            entry['submission'], _ = stepikclient.send_submission(user, submission)
+    except ExitError as e:
+        entry['status'] = 'error'
+        entry['message'] = str(e)
+    except Exception as e:
+        entry['status'] = 'error'
+        entry['message'] = repr(e)
+    return entry
+
+
+def submit_batch(user, entries, workers=4, deadline=None):
+    """
+    create attempts and post the submissions concurrently, then poll for all of their verdicts together
+    return the entries, updated with the results of each submission
+    """
+    for entry in entries:
+        entry.update({'attempt': None, 'submission': None, 'status': None, 'seconds': None, 'message': ''})
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        list(pool.map(lambda entry: _send(user, entry), entries))
+
+    sent = [entry for entry in entries if entry['submission'] is not None]
+    poller = stepikclient.create_poller(user)
+    if deadline is not None:
+        poller.deadline = deadline
+    try:
+        poller.wait([entry['submission'] for entry in sent])
+    except TimeoutError:
+        pass
+    for entry in sent:
+        result = poller.results.get(entry['submission'])
+        if result is None:
+            entry['status'] = 'timeout'
+            continue
+        entry['status'] = result['status']
+        entry['message'] = result.get('hint') or ''
+        entry['seconds'] = round(poller.stats['latency'][entry['submission']], 2)
+    return entries
+
+
+def format_results(entries, as_json=False):
+    if as_json:
+        return json.dumps([{field: entry.get(field) for field in FIELDS} for entry in entries])
+    rows = ["\t".join(FIELDS)]
+    for entry in entries:
+        rows.append("\t".join(
+            "" if entry.get(field) is None else str(entry[field]).replace("\t", " ").replace("\n", " ")
+            for field in FIELDS
+        ))
+    return "\n".join(rows)
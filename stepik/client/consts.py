@@ -1,8 +1,12 @@
+import os
+
 GRAND_TYPE_PASSWORD = "password"
 GRAND_TYPE_CREDENTIALS = "client_credentials"
 
-STEPIK_HOST = "https://stepik.org/"
+# STEPIK_HOST can point the CLI at another server (ex: a fake one for benchmarks)
+STEPIK_HOST = os.environ.get("STEPIK_HOST", "https://stepik.org/")
 STEPIK_API_URL = STEPIK_HOST + "api"
+OAUTH_TOKEN = STEPIK_HOST + "oauth2/token/"
 
 LESSONS = STEPIK_API_URL + "/lessons/"
 LESSONS_PK = LESSONS + "{}"
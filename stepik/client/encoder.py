@@ -0,0 +1,71 @@
+import io
+import sys
+import json
+import time
+from json.encoder import encode_basestring
+
+from ..settings import SUBMISSION_SIZE_LIMIT
+from ..utils import exit_util
+
+# the number of characters to read from a file at once
+CHUNK_SIZE = 64 * 1024
+
+
+class FileContents:
+    """
+    A placeholder for the contents of a file within a submission
+    The file is only read when the submission is encoded
+    """
+
+    def __init__(self, filename):
+        self.filename = str(filename)
+
+    def open(self):
+        if self.filename and self.filename != '-':
+            return open(self.filename, "r")
+        return sys.stdin
+
+    def read(self):
+        with self.open() as file:
+            return file.read()
+
+
+def _marker(index):
+    return "\0stepik-file-{}\0".format(index)
+
+
+def encode_submission(submission, limit=SUBMISSION_SIZE_LIMIT):
+    """
+    encode a submission as a JSON request body, streaming the contents of any files into it
+    so that a large file is only held in memory once, already encoded
+    return the body (a file-like object) and a dict with the number of bytes and the seconds it took
+    """
+    start = time.perf_counter()
+    files = []
+
+    def placeholder(obj):
+        if isinstance(obj, FileContents):
+            files.append(obj)
+            return _marker(len(files) - 1)
+        raise TypeError("{} is not JSON serializable".format(type(obj).__name__))
+
+    text = json.dumps(submission, default=placeholder, ensure_ascii=False)
+    body = io.BytesIO()
+    size = 0
+    for index, contents in enumerate(files):
+        # the marker is itself encoded as a JSON string, so look for that
+        before, text = text.split(json.dumps(_marker(index)), 1)
+        size += body.write(before.encode('utf-8'))
+        size += body.write(b'"')
+        with contents.open() as file:
+            for chunk in iter(lambda: file.read(CHUNK_SIZE), ''):
+                # encode_basestring adds quotes around the chunk, so we strip them
+                size += body.write(encode_basestring(chunk)[1:-1].encode('utf-8'))
+                if size > limit:
+                    exit_util("{} is too large to submit. The limit is {} bytes.".format(contents.filename, limit))
+        size += body.write(b'"')
+    size += body.write(text.encode('utf-8'))
+    if size > limit:
+        exit_util("This submission is too large. The limit is {} bytes.".format(limit))
+    body.seek(0)
+    return body, {'bytes': size, 'seconds': time.perf_counter() - start}
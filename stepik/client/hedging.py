@@ -0,0 +1,143 @@
+import json
+import time
+import atexit
+import threading
+from collections import deque
+
+from ..settings import HEDGE_PERCENTILE, HEDGE_DELAY, HEDGE_MIN_DELAY, HEDGE_SAMPLES, HEDGE_MIN_SAMPLES, HEDGE_FILE
+
+# set to True to hedge GET requests (ex: via the --hedge option)
+enabled = False
+
+# requests: hedgeable requests, hedged: how many of them were sent twice, wins: how many times the second one won
+# saved: the number of seconds that the winning second requests saved, compared to waiting for the first ones
+stats = {'requests': 0, 'hedged': 0, 'wins': 0, 'saved': 0.0}
+
+# the latencies of recent requests, which are kept between runs in HEDGE_FILE
+_latencies = deque(maxlen=HEDGE_SAMPLES)
+_lock = threading.Lock()
+_loaded = False
+
+
+def _load():
+    global _loaded
+    with _lock:
+        if _loaded:
+            return
+        _loaded = True
+        try:
+            with open(HEDGE_FILE) as file:
+                data = json.load(file)
+            _latencies.extend(data['latencies'])
+            for key in stats:
+                stats[key] += data['stats'][key]
+        except (OSError, ValueError, KeyError):
+            pass
+    atexit.register(save)
+
+
+def save():
+    with _lock:
+        data = {'latencies': list(_latencies), 'stats': dict(stats)}
+    try:
+        with open(HEDGE_FILE, "w") as file:
+            json.dump(data, file)
+    except OSError:
+        pass
+
+
+def delay():
+    """the number of seconds to wait for a response before sending a second request: a high percentile of the latency"""
+    with _lock:
+        if len(_latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DELAY
+        latencies = sorted(_latencies)
+    index = min(len(latencies) * HEDGE_PERCENTILE // 100, len(latencies) - 1)
+    return max(latencies[index], HEDGE_MIN_DELAY)
+
+
+def _start(send):
+    """call send() in a background thread. return a future for its response"""
+    from concurrent.futures import Future
+
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(send())
+        except BaseException as e:
+            future.set_exception(e)
+
+    # a daemon thread, so that a slow loser never keeps the CLI from exiting
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def _discard(future):
+    """close the response of a request that lost the race, to give its connection back to the pool"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def hedged(send):
+    """
+    call send() and, if it doesn't respond within delay(), call it again in parallel
+    return the first response (send() must be idempotent, since it may be called twice)
+    """
+    from concurrent.futures import TimeoutError, as_completed
+
+    _load()
+    start = time.monotonic()
+    primary = _start(send)
+    with _lock:
+        stats['requests'] += 1
+    try:
+        resp = primary.result(timeout=delay())
+    except TimeoutError:
+        pass
+    else:
+        _record(time.monotonic() - start)
+        return resp
+
+    hedge = _start(send)
+    with _lock:
+        stats['hedged'] += 1
+    error = None
+    for winner in as_completed((primary, hedge)):
+        if winner.exception() is None:
+            break
+        error = winner.exception()
+    else:
+        raise error
+    elapsed = time.monotonic() - start
+    _record(elapsed)
+    loser = hedge if winner is primary else primary
+    if winner is hedge:
+        with _lock:
+            stats['wins'] += 1
+
+        def saved(future):
+            if not future.cancelled() and future.exception() is None:
+                with _lock:
+                    stats['saved'] += time.monotonic() - start - elapsed
+
+        primary.add_done_callback(saved)
+    loser.cancel()
+    loser.add_done_callback(_discard)
+    return winner.result()
+
+
+def format_stats():
+    with _lock:
+        saved = stats['saved']
+        requests, hedged, wins = stats['requests'], stats['hedged'], stats['wins']
+    return "Hedged {} of {} requests ({:.1%}). The second request won {} times, saving {:.2f}s.".format(
+        hedged, requests, hedged / requests if requests else 0, wins, saved
+    )
+
+
+def _record(latency):
+    with _lock:
+        _latencies.append(latency)
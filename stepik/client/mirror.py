@@ -0,0 +1,78 @@
+import os
+import gzip
+import json
+import zlib
+
+from ..settings import MIRROR_FOLDER
+
+# set to False to ignore the mirror entirely (ex: via the --no-cache option)
+enabled = True
+
+# the kinds of entities that can be mirrored
+KINDS = ('courses', 'sections', 'units', 'lessons', 'steps')
+
+
+def _path(kind, entity_id):
+    return "{}/{}/{}.json.gz".format(MIRROR_FOLDER, kind, entity_id)
+
+
+def lookup(kind, entity_id):
+    """return the mirrored payload of an entity or None if it isn't in the mirror"""
+    if not enabled or kind not in KINDS:
+        return None
+    try:
+        with gzip.open(_path(kind, entity_id), "rt", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def lookup_all(kind, ids):
+    """return the mirrored payloads of these entities, in order, or None if any of them are missing"""
+    entities = []
+    for entity_id in ids:
+        entity = lookup(kind, entity_id)
+        if entity is None:
+            return None
+        entities.append(entity)
+    return entities
+
+
+def stamp(entity):
+    """a value that changes whenever the entity does: its update date, or a checksum if it doesn't have one"""
+    if entity.get('update_date'):
+        return entity['update_date']
+    return zlib.crc32(json.dumps(entity, sort_keys=True).encode('utf-8'))
+
+
+def load_index():
+    """return the stamp of every mirrored entity, keyed by "kind/id" """
+    try:
+        with open(MIRROR_FOLDER + "/index.json") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return dict()
+
+
+def save_index(index):
+    _write(MIRROR_FOLDER + "/index.json", json.dumps(index).encode('utf-8'))
+
+
+def store(kind, entity, index):
+    """mirror the entity if it has changed since it was last stored. return whether it was written"""
+    key = "{}/{}".format(kind, entity['id'])
+    entity_stamp = stamp(entity)
+    if index.get(key) == entity_stamp and os.path.exists(_path(kind, entity['id'])):
+        return False
+    _write(_path(kind, entity['id']), gzip.compress(json.dumps(entity).encode('utf-8')))
+    index[key] = entity_stamp
+    return True
+
+
+def _write(path, contents):
+    # write to a temporary file first, so that readers never see a partial file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = "{}.{}.tmp".format(path, os.getpid())
+    with open(temporary, "wb") as file:
+        file.write(contents)
+    os.replace(temporary, path)
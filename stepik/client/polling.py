@@ -0,0 +1,96 @@
+import time
+import random
+import datetime
+from email.utils import parsedate_to_datetime
+
+from ..settings import POLL_INTERVAL, POLL_BACKOFF, POLL_MAX_INTERVAL, POLL_JITTER, POLL_DEADLINE, \
+    POLL_BATCH_SIZE
+
+
+def retry_after(resp, default):
+    """the number of seconds that a response asks us to wait before trying again"""
+    value = resp.headers.get('Retry-After')
+    if value is None:
+        return default
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    return max((when - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0)
+
+
+class Poller:
+    """
+    Polls the status of submissions until they have all been evaluated
+    Pending submissions are polled together, POLL_BATCH_SIZE at a time
+    fetch(ids) should return the response to a request for the submissions with those ids
+    """
+
+    def __init__(
+        self, fetch, interval=POLL_INTERVAL, backoff=POLL_BACKOFF, max_interval=POLL_MAX_INTERVAL,
+        jitter=POLL_JITTER, deadline=POLL_DEADLINE, on_poll=None
+    ):
+        self.fetch = fetch
+        self.interval = interval
+        self.backoff = backoff
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.deadline = deadline
+        self.on_poll = on_poll
+        # polls: the number of polling rounds, requests: the number of requests they took
+        # latency: the number of seconds until each submission's verdict
+        self.stats = {'polls': 0, 'requests': 0, 'throttled': 0, 'latency': {}}
+        # the submissions that have been evaluated so far
+        self.results = {}
+
+    def _fetch(self, submission_ids):
+        """return the submissions with these ids or the response, if the server throttled us"""
+        resp = self.fetch(submission_ids)
+        self.stats['requests'] += 1
+        if resp.status_code == 429:
+            self.stats['throttled'] += 1
+            return resp
+        return resp.json()['submissions']
+
+    def _sleep(self, seconds, end):
+        seconds = min(seconds, end - time.monotonic())
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, submission_ids):
+        """
+        poll until none of the submissions are being evaluated
+        return a dict mapping each submission id to its submission
+        raise a TimeoutError if the deadline passes first
+        """
+        start = time.monotonic()
+        end = start + self.deadline
+        pending = list(dict.fromkeys(submission_ids))
+        results = self.results
+        interval = self.interval
+        while True:
+            self.stats['polls'] += 1
+            throttled_for = 0
+            for batch_start in range(0, len(pending), POLL_BATCH_SIZE):
+                submissions = self._fetch(pending[batch_start:batch_start+POLL_BATCH_SIZE])
+                if not isinstance(submissions, list):
+                    throttled_for = retry_after(submissions, interval)
+                    break
+                for submission in submissions:
+                    if submission['status'] != 'evaluation':
+                        results[submission['id']] = submission
+                        self.stats['latency'][submission['id']] = time.monotonic() - start
+            pending = [submission_id for submission_id in pending if submission_id not in results]
+            if not pending:
+                return results
+            if time.monotonic() >= end:
+                raise TimeoutError("exceeded the deadline with {} submissions pending".format(len(pending)))
+            if self.on_poll is not None:
+                self.on_poll()
+            delay = interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            self._sleep(max(delay, throttled_for), end)
+            interval = min(interval * self.backoff, self.max_interval)
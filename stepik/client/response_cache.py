@@ -0,0 +1,59 @@
+import time
+
+from ..disk_cache import DiskCache
+from ..settings import RESPONSE_CACHE_FOLDER, RESPONSE_CACHE_SIZE
+
+# set to False to bypass the cache entirely (ex: via the --no-cache option)
+enabled = True
+# set to True to ignore the cached responses, but still cache the new ones (ex: via course --recache)
+refresh = False
+
+_cache = DiskCache(RESPONSE_CACHE_FOLDER, RESPONSE_CACHE_SIZE)
+
+
+def _key(user, url):
+    return "{}\t{}".format(user.client_id, url)
+
+
+def lookup(user, url):
+    """return the cached entry for this url or None if there isn't one"""
+    if not enabled or refresh:
+        return None
+    return _cache.get(_key(user, url))
+
+
+def is_fresh(entry, ttl):
+    return time.time() - entry['stored'] < ttl
+
+
+def validators(entry):
+    """headers that ask the server to only send the response if it has changed"""
+    headers = dict()
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    return headers
+
+
+def store(user, url, body, headers):
+    if not enabled:
+        return
+    _cache.put(_key(user, url), {
+        'stored': time.time(),
+        'etag': headers.get('ETag'),
+        'last_modified': headers.get('Last-Modified'),
+        'body': body
+    })
+
+
+def revalidated(user, url, entry):
+    """the server confirmed that the entry is still valid, so we can keep using it"""
+    if not enabled:
+        return
+    entry['stored'] = time.time()
+    _cache.put(_key(user, url), entry)
+
+
+def clear():
+    return _cache.clear()
@@ -0,0 +1,57 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..settings import POOL_SIZE, REQUEST_TIMEOUT
+
+_session = None
+
+
+class TimeoutAdapter(HTTPAdapter):
+    """a pooled adapter that applies a default timeout to every request"""
+
+    def __init__(self, timeout=REQUEST_TIMEOUT, pool_size=POOL_SIZE, **kwargs):
+        self.timeout = timeout
+        super().__init__(pool_connections=pool_size, pool_maxsize=pool_size, **kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+def create_session(pool_size=POOL_SIZE, timeout=REQUEST_TIMEOUT):
+    session = requests.Session()
+    adapter = TimeoutAdapter(timeout=timeout, pool_size=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({'Accept': 'application/json', 'Connection': 'keep-alive'})
+    return session
+
+
+def get_session():
+    """return the session shared by every request made in this process"""
+    global _session
+    if _session is None:
+        _session = create_session()
+    return _session
+
+
+def set_session(session):
+    """replace the shared session (ex: with one that has a different pool size)"""
+    global _session
+    if _session is not None and _session is not session:
+        _session.close()
+    _session = session
+
+
+def stats():
+    """count the requests sent and the connections that were opened or reused for them"""
+    sent = opened = 0
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                sent += pool.num_requests
+                opened += pool.num_connections
+    return {'requests': sent, 'opened': opened, 'reused': max(sent - opened, 0)}
@@ -1,29 +1,87 @@
 import os
+import sys
 import json
+import zlib
 
 import time
 import click
-import requests
 import datetime
+import requests
 
+from . import hedging, mirror, response_cache, token_manager
 from .attempt import Attempt
+from .encoder import FileContents, encode_submission
+from .polling import Poller, retry_after
 from .auth import get_headers
+from .session import get_session
+from .throttle import OVERLOADED_STATUSES, RETRY_STATUSES, backoff, throttle
 from .consts import STEPIK_API_URL, LESSONS_PK, SUBMISSIONS_PK, STEPS_PK, COURSES_PK, ATTEMPTS, SUBMISSIONS, \
     SECTIONS, UNITS, SECTIONS_PK, LESSONS, STEPS
 
-from .. import attempt_cache
+from .. import attempt_cache, trace
 from ..filemanager import FileManager
 from ..languagemanager import LanguageManager
+from ..settings import CACHE_TTL, DOWNLOAD_CHUNK_SIZE, DOWNLOAD_RETRIES, REQUEST_RETRIES, RETRY_MAX_WAIT
 from ..utils import exit_util, get_lesson_id, get_step_id, prepare_ids
 
 
-def request(request_type, link, **kwargs):
-    resp = None
+def _send(request_type, link, **kwargs):
+    """send a request once the throttle allows it, and tell the throttle whether the server was overloaded"""
+    ticket = throttle.acquire()
     try:
-        resp = requests.__dict__[request_type](link, **kwargs)
-    except Exception as e:
-        exit_util(e.args[0])
-    if resp.status_code >= 400:
+        resp = get_session().request(request_type, link, **kwargs)
+    except (requests.ConnectionError, requests.Timeout):
+        # the server may be too busy to answer, so slow down
+        throttle.release(ticket, overloaded=True)
+        raise
+    except BaseException:
+        # this says nothing about the server
+        throttle.release(ticket, overloaded=None)
+        raise
+    overloaded = resp.status_code in OVERLOADED_STATUSES
+    throttle.release(ticket, overloaded, retry_after(resp, None) if overloaded else None)
+    return resp
+
+
+def request(request_type, link, allow_status=(), **kwargs):
+    resp = None
+    # only requests that don't change anything can safely be sent again
+    idempotent = request_type.lower() == "get"
+    retries = REQUEST_RETRIES if idempotent else 0
+    with trace.span('http', request_type.upper() + " " + trace.url_template(link)) as span:
+        for attempt in range(retries + 1):
+            try:
+                if hedging.enabled and idempotent and not kwargs.get('stream'):
+                    resp = hedging.hedged(lambda: _send(request_type, link, **kwargs))
+                else:
+                    resp = _send(request_type, link, **kwargs)
+                if resp.status_code == 401 and 'Authorization' in kwargs.get('headers', {}):
+                    # our token was rejected, so renew it and try once more
+                    rejected = kwargs['headers']['Authorization'][len('Bearer '):]
+                    user = token_manager.renew_after_unauthorized(rejected)
+                    if user is not None:
+                        kwargs['headers'] = dict(kwargs['headers'], **get_headers(user))
+                        if hasattr(kwargs.get('data'), 'seek'):
+                            kwargs['data'].seek(0)
+                        resp = _send(request_type, link, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # the connection failed or timed out, which might not happen again
+                if attempt == retries:
+                    exit_util(e.args[0])
+                time.sleep(backoff(attempt))
+                continue
+            except Exception as e:
+                exit_util(e.args[0])
+            if attempt == retries or resp.status_code not in RETRY_STATUSES or resp.status_code in allow_status:
+                break
+            resp.close()
+            time.sleep(min(retry_after(resp, backoff(attempt)), RETRY_MAX_WAIT))
+        if trace.enabled:
+            span['status'] = resp.status_code
+            span['retries'] = attempt
+            # don't read the body of a streamed response here, or there would be nothing left for the caller
+            span['bytes'] = int(resp.headers.get('Content-Length', 0) if kwargs.get('stream') else len(resp.content))
+    if resp.status_code >= 400 and resp.status_code not in allow_status:
         exit_util("Something went wrong. A request returned {}".format(resp.status_code))
     return resp
 
@@ -36,21 +94,48 @@ def get_request(link, **kwargs):
     return request("get", link, **kwargs)
 
 
-def get_entity(user, entity_id, url_template):
-    entity = get_request(url_template.format(entity_id), headers=get_headers(user))
-    return entity.json()
+def get_entity(user, entity_id, url_template, ttl=None):
+    kind = url_template.split('/')[-2]
+    entity = mirror.lookup(kind, entity_id)
+    if entity is not None:
+        return {'meta': {'has_next': False}, kind: [entity]}
+    url = url_template.format(entity_id)
+    if ttl is None:
+        return get_request(url, headers=get_headers(user)).json()
+    return get_cached(user, url, ttl)
+
+
+def get_cached(user, url, ttl):
+    """GET a url through the response cache, revalidating the cached response once it is older than ttl"""
+    with trace.span('cache', trace.url_template(url)) as span:
+        entry = response_cache.lookup(user, url)
+        if entry is not None and response_cache.is_fresh(entry, ttl):
+            span['cache'] = 'hit'
+            return entry['body']
+        headers = get_headers(user)
+        if entry is not None:
+            headers.update(response_cache.validators(entry))
+        resp = get_request(url, headers=headers)
+        if resp.status_code == 304 and entry is not None:
+            span['cache'] = 'revalidated'
+            response_cache.revalidated(user, url, entry)
+            return entry['body']
+        span['cache'] = 'miss'
+        body = resp.json()
+        response_cache.store(user, url, body, resp.headers)
+        return body
 
 
 def get_course(user, course_id):
-    return get_entity(user, course_id, COURSES_PK)
+    return get_entity(user, course_id, COURSES_PK, CACHE_TTL['courses'])
 
 
 def get_section(user, section_id):
-    return get_entity(user, section_id, SECTIONS_PK)
+    return get_entity(user, section_id, SECTIONS_PK, CACHE_TTL['sections'])
 
 
 def get_lesson(user, lesson_id):
-    return get_entity(user, lesson_id, LESSONS_PK)
+    return get_entity(user, lesson_id, LESSONS_PK, CACHE_TTL['lessons'])
 
 
 def get_submission(user, submission_id):
@@ -58,7 +143,7 @@ def get_submission(user, submission_id):
 
 
 def get_step(user, step_id):
-    return get_entity(user, step_id, STEPS_PK)
+    return get_entity(user, step_id, STEPS_PK, CACHE_TTL['steps'])
 
 
 def get_attempt_id(user, step_id):
@@ -87,25 +172,42 @@ def get_languages_list(user, step_id):
     return [lang for lang in languages]
 
 
-def evaluate(user, attempt_id):
+def get_submissions(user, submission_ids):
+    """request several submissions at once. a throttled (429) response is returned as is"""
+    submission_url = SUBMISSIONS[:-1] if SUBMISSIONS.endswith('/') else SUBMISSIONS
+    return get_request(
+        submission_url + "?" + prepare_ids(submission_ids),
+        headers=get_headers(user), allow_status=(429,)
+    )
+
+
+def create_poller(user, **kwargs):
+    return Poller(lambda submission_ids: get_submissions(user, submission_ids), **kwargs)
+
+
+def evaluate(user, submission_id, deadline=None):
+    """wait for the verdict of a submission. return the polling stats"""
     click.secho("Evaluating...", bold=True, fg='white', err=True, nl=False)
-    time_out = 0.1
-    max_time = 60
-    while True:
-        result = get_submission(user, attempt_id)
-        status = result['submissions'][0]['status']
-        hint = result['submissions'][0]['hint']
-        if status != 'evaluation':
-            break
-        if time_out >= max_time:
+    poller = create_poller(user, on_poll=lambda: click.echo(".", nl=False, err=True))
+    if deadline is not None:
+        poller.deadline = deadline
+    with trace.span('evaluate', 'wait for verdict') as span:
+        try:
+            result = poller.wait([submission_id])[submission_id]
+        except TimeoutError:
             exit_util("\nExceeded maximum evaluation time.", 3)
-        click.echo(".", nl=False, err=True)
-        time.sleep(time_out)
-        # time_out doubles each time (so it's exponential!)
-        time_out += time_out
+        span['polls'] = poller.stats['polls']
+    status = result['status']
+    hint = result['hint']
     click.secho("\nYour solution is {}".format(status), fg=['red', 'green'][status == 'correct'], bold=True)
+    click.secho(
+        "Received the verdict after {} polls ({:.1f}s).".format(
+            poller.stats['polls'], poller.stats['latency'][submission_id]
+        ), fg='white', err=True
+    )
     if status != 'correct':
         exit_util(hint, 2)
+    return poller.stats
 
 
 def get_dataset_attempt(user, step_id, attempt_id=None):
@@ -135,22 +237,152 @@ def get_dataset_attempt(user, step_id, attempt_id=None):
     return attempt
 
 
-def download_dataset(user, filename, step_id=None, attempt_id=None):
+def decompressed(chunks):
+    """
+    transparently decompress gzip or zlib data. anything else is passed through as is
+    plain text can start with bytes that look like a zlib header (ex: "x^"), so the first DOWNLOAD_CHUNK_SIZE bytes
+    are held back until they're known to decompress. a later error raises zlib.error
+    """
+    chunks = iter(chunks)
+    first = next(chunks, b'')
+    is_gzip = first.startswith(b'\x1f\x8b')
+    is_zlib = len(first) > 1 and first[0] == 0x78 and (first[0] * 256 + first[1]) % 31 == 0
+    if not (is_gzip or is_zlib):
+        yield first
+        yield from chunks
+        return
+    # 47 tells zlib to detect whether there is a gzip or a zlib header
+    decompressor = zlib.decompressobj(47)
+    raw, data, size = [first], [], len(first)
+    try:
+        data.append(decompressor.decompress(first))
+        while size < DOWNLOAD_CHUNK_SIZE and not decompressor.eof:
+            chunk = next(chunks, None)
+            if chunk is None:
+                # all of it fit in the first bytes
+                data.append(decompressor.flush())
+                if not decompressor.eof:
+                    raise zlib.error("The data ended before the end of the compressed stream.")
+                break
+            raw.append(chunk)
+            size += len(chunk)
+            data.append(decompressor.decompress(chunk))
+    except zlib.error:
+        yield from raw
+        yield from chunks
+        return
+    yield from data
+    for chunk in chunks:
+        yield decompressor.decompress(chunk)
+    yield decompressor.flush()
+    if not decompressor.eof:
+        raise zlib.error("The data ended before the end of the compressed stream.")
+
+
+def _with_progress(chunks, length, offset, label):
+    """display a progress bar while the chunks are consumed"""
+    if length is None or not sys.stderr.isatty():
+        yield from chunks
+        return
+    with click.progressbar(length=length, label=label, file=sys.stderr) as bar:
+        bar.update(offset)
+        for chunk in chunks:
+            bar.update(len(chunk))
+            yield chunk
+
+
+def download_file(user, url, filename, part_name=None, decompress=False):
+    """
+    stream a file to disk in chunks, with a progress bar
+    the data is first written to part_name, so that an interrupted download can be resumed with a Range request
+    """
+    headers = get_headers(user)
+    # we need the exact bytes of the file for a Range request to make sense
+    headers['Accept-Encoding'] = 'identity'
+    file_manager = FileManager()
+    if str(filename) == '-':
+        resp = get_request(url, headers=headers, stream=True)
+        chunks = resp.iter_content(DOWNLOAD_CHUNK_SIZE)
+        file_manager.write_chunks(filename, decompressed(chunks) if decompress else chunks)
+        return
+    if part_name is None:
+        part_name = str(filename) + ".part"
+    for retry in range(DOWNLOAD_RETRIES + 1):
+        offset = os.path.getsize(part_name) if os.path.exists(part_name) else 0
+        if offset:
+            headers['Range'] = 'bytes={}-'.format(offset)
+        resp = get_request(url, headers=headers, stream=True, allow_status=(416,))
+        if resp.status_code == 416:
+            resp.close()
+            if _total_size(url, headers, resp) == offset:
+                # the partial file is already the whole file
+                break
+            # the partial file doesn't match the one on the server, so start over
+            os.remove(part_name)
+            headers.pop('Range', None)
+            continue
+        if resp.status_code != 206:
+            # the server ignored the Range header and sent the whole file
+            offset = 0
+        length = resp.headers.get('Content-Length')
+        length = None if length is None else offset + int(length)
+        try:
+            file_manager.write_chunks(
+                part_name, _with_progress(resp.iter_content(DOWNLOAD_CHUNK_SIZE), length, offset, "Downloading"),
+                append=bool(offset)
+            )
+            break
+        except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError):
+            if retry == DOWNLOAD_RETRIES:
+                exit_util("The download was interrupted. Run the command again with the same attempt to resume it.")
+    else:
+        exit_util("Unable to download {}".format(url))
+    if decompress:
+        try:
+            file_manager.write_chunks(filename, decompressed(_read_chunks(part_name)))
+        except zlib.error:
+            # it only looked compressed, so keep it as it is
+            file_manager.write_chunks(filename, _read_chunks(part_name))
+        os.remove(part_name)
+    else:
+        os.replace(part_name, str(filename))
+
+
+def _total_size(url, headers, resp):
+    """the size of the whole file, from the Content-Range of a 416 response or else a HEAD request"""
+    content_range = resp.headers.get('Content-Range', '')
+    if content_range.startswith('bytes */'):
+        try:
+            return int(content_range[len('bytes */'):])
+        except ValueError:
+            pass
+    headers = {key: value for key, value in headers.items() if key != 'Range'}
+    head = request("head", url, headers=headers, allow_status=range(400, 600))
+    length = head.headers.get('Content-Length')
+    if head.status_code >= 400 or length is None:
+        return None
+    return int(length)
+
+
+def _read_chunks(filename):
+    with open(filename, "rb") as file:
+        for chunk in iter(lambda: file.read(DOWNLOAD_CHUNK_SIZE), b''):
+            yield chunk
+
+
+def download_dataset(user, filename, step_id=None, attempt_id=None, decompress=False):
     data = attempt_cache.get_data()
     if step_id is None:
         step_id = attempt_cache.get_step_id(data)
     attempt = get_dataset_attempt(user, step_id, attempt_id)
+    # the clock starts as soon as we have the attempt, not when the download finishes
+    start_time = datetime.datetime.now()
     if attempt['dataset_url'].startswith('/api'):
         attempt['dataset_url'] = attempt['dataset_url'][len('/api'):]
-    try:
-        dataset = get_request(
-            STEPIK_API_URL+attempt['dataset_url'],
-            headers=get_headers(user)
-        )
-    except Exception:
-        exit_util("Unable to retrieve dataset for attempt {}".format(attempt['id']))
-    FileManager().write_to_file(filename, dataset.text)
-    start_time = datetime.datetime.now()
+    download_file(
+        user, STEPIK_API_URL+attempt['dataset_url'], filename,
+        "{}.{}.part".format(filename, attempt['id']), decompress
+    )
     time_left = datetime.timedelta(seconds=int(attempt['time_left']))
     attempt = Attempt(
         attempt['id'], start_time, start_time + time_left,
@@ -160,13 +392,11 @@ def download_dataset(user, filename, step_id=None, attempt_id=None):
     return attempt
 
 
-def submit_code(user, filename, lang=None, step_id=None, attempt_id=None):
-    file_manager = FileManager()
-
-    try:
-        text_contents = "".join(file_manager.read_file(filename))
-    except FileNotFoundError:
+def prepare_submission(user, filename, lang=None, step_id=None, attempt_id=None):
+    """create the submission for a solution file, detecting its language and shaping its reply"""
+    if str(filename) != '-' and not FileManager.is_local_file(filename):
         exit_util("File {} not found".format(filename))
+    text_contents = FileContents(filename)
 
     if step_id is None:
         step_id = attempt_cache.get_step_id()
@@ -216,14 +446,27 @@ def submit_code(user, filename, lang=None, step_id=None, attempt_id=None):
                 "code": text_contents,
                 "language": language
             }
-    submit = post_submit(
-        user, json.dumps(submission), submission['submission']['attempt']
-    )
+    return submission
+
+
+def send_submission(user, submission):
+    """post a submission. return its ID and the stats from encoding it"""
+    body, stats = encode_submission(submission)
+    submit = post_submit(user, body, submission['submission']['attempt'])
     try:
-        submission = submit['submissions'][-1]['id']
+        return submit['submissions'][-1]['id'], stats
     except IndexError:
         exit_util("There was a problem with the format of the submission.")
-    evaluate(user, submission)
+
+
+def submit_code(user, filename, lang=None, step_id=None, attempt_id=None, deadline=None):
+    submission = prepare_submission(user, filename, lang, step_id, attempt_id)
+    submission_id, stats = send_submission(user, submission)
+    click.secho(
+        "Sent {} bytes (encoded in {:.3f}s).".format(stats['bytes'], stats['seconds']),
+        fg='white', err=True
+    )
+    evaluate(user, submission_id, deadline)
 
 
 def set_step(user, step_url):
@@ -243,12 +486,8 @@ def set_step(user, step_url):
     if len(steps) < step_id or step_id < 1:
         exit_util("Too few steps in the lesson.")
 
-    data = attempt_cache.get_data()
-    data['steps'] = steps
-    data['current_position'] = step_id
-    attempt_cache.set_data(data)
     try:
-        attempt_cache.set_lesson_id(lesson_id)
+        attempt_cache.set_position(steps=steps, current_position=step_id, lesson_id=lesson_id)
     except PermissionError:
         exit_util("You do not have permission to perform this action.")
     click.secho("Current position set to lesson {}, step {}".format(lesson_id, step_id), fg="green", bold=True)
@@ -259,7 +498,13 @@ def get_courses(user, **kwargs):
     return courses.json()
 
 
-def get_entities_with_ids(user, ids, page, url):
+def get_entities_with_ids(user, ids, page, url, mirrored=True):
+    if mirrored:
+        # the mirror has every entity on the first page
+        kind = url.split('/')[-2]
+        entities = mirror.lookup_all(kind, ids)
+        if entities is not None:
+            return {'meta': {'page': page, 'has_next': False}, kind: entities if page == 1 else []}
     url = url + "?" + prepare_ids(ids) + '&page=' + str(page)
     entities = get_request(url, headers=get_headers(user))
     return entities.json()
@@ -0,0 +1,52 @@
+from . import mirror, session, stepikclient
+from .consts import COURSES_PK, SECTIONS, UNITS, LESSONS, STEPS
+from ..utils import batched_entities_iterator
+
+
+def _load(user, url, kind, ids):
+    """yield the payloads of the entities with these ids, fetched from the API in concurrent ids[] pages"""
+    def getter(user, ids, page_index):
+        return stepikclient.get_entities_with_ids(user, ids, page_index, url, mirrored=False)
+
+    return batched_entities_iterator(getter, user, kind, ids)
+
+
+def sync(user, course_id):
+    """
+    mirror the course, its sections, units, lessons, and steps on disk
+    the steps of a lesson are only downloaded again if the lesson has changed since the last sync
+    return the number of entities that were written, by kind, and the number of requests used
+    """
+    sent = session.stats()['requests']
+    index = mirror.load_index()
+    written = dict.fromkeys(mirror.KINDS, 0)
+
+    def store(kind, entity):
+        changed = mirror.store(kind, entity, index)
+        written[kind] += changed
+        return changed
+
+    try:
+        course = stepikclient.get_request(
+            COURSES_PK.format(course_id), headers=stepikclient.get_headers(user)
+        ).json()['courses'][0]
+        store('courses', course)
+        unit_ids = []
+        for section in _load(user, SECTIONS, 'sections', course['sections']):
+            store('sections', section)
+            unit_ids.extend(section['units'])
+        lesson_ids = []
+        for unit in _load(user, UNITS, 'units', unit_ids):
+            store('units', unit)
+            lesson_ids.append(unit['lesson'])
+        step_ids = []
+        for lesson in _load(user, LESSONS, 'lessons', lesson_ids):
+            # an unchanged lesson might still be missing steps, if an earlier sync was interrupted
+            if store('lessons', lesson) or any(mirror.lookup('steps', step_id) is None for step_id in lesson['steps']):
+                step_ids.extend(lesson['steps'])
+        for step in _load(user, STEPS, 'steps', step_ids):
+            store('steps', step)
+    finally:
+        # keep track of everything that was written, even if the sync didn't finish
+        mirror.save_index(index)
+    return written, session.stats()['requests'] - sent
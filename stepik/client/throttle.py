@@ -0,0 +1,95 @@
+import time
+import random
+import threading
+
+from ..settings import MIN_CONCURRENCY, MAX_CONCURRENCY, RATE_LIMIT, RATE_BURST, RETRY_BACKOFF, RETRY_MAX_WAIT
+
+# responses that mean the server is overloaded, so we should slow down
+OVERLOADED_STATUSES = (429, 503, 504)
+# responses to a GET that are worth retrying
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def backoff(attempt, base=None):
+    """the number of seconds to wait before retrying for the attempt-th time (counting from 0)"""
+    if base is None:
+        base = RETRY_BACKOFF
+    return base * 2 ** attempt * random.uniform(1, 1.5)
+
+
+class Throttle:
+    """
+    Limits the requests that are sent by every thread
+    The number of requests in flight is adjusted with AIMD: it grows by about one for every round of
+    successful requests, and it is halved whenever the server says that it is overloaded.
+    A token bucket also limits the number of requests that are sent per second.
+    """
+
+    def __init__(
+        self, min_concurrency=MIN_CONCURRENCY, max_concurrency=MAX_CONCURRENCY, rate=RATE_LIMIT, burst=RATE_BURST,
+        decrease=0.5, max_pause=RETRY_MAX_WAIT
+    ):
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst
+        self.decrease = decrease
+        self.max_pause = max_pause
+        # the number of requests that may be in flight at once
+        self.limit = float(max_concurrency)
+        self.stats = {'requests': 0, 'throttled': 0, 'waited': 0.0}
+        self._in_flight = 0
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._paused_until = 0
+        # incremented whenever the limit is decreased, so that the responses to requests that were sent before
+        # the decrease don't decrease it again
+        self._epoch = 0
+        self._condition = threading.Condition()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def acquire(self):
+        """wait until a request may be sent. return a ticket to pass to release()"""
+        start = time.monotonic()
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0 and self._in_flight < int(self.limit):
+                    if self._tokens >= 1:
+                        break
+                    wait = (1 - self._tokens) / self.rate
+                self._condition.wait(wait if wait > 0 else None)
+            self._tokens -= 1
+            self._in_flight += 1
+            self.stats['requests'] += 1
+            self.stats['waited'] += now - start
+            return self._epoch
+
+    def release(self, ticket, overloaded=False, pause=None):
+        """
+        record the outcome of a request
+        overloaded: whether the server said that it is overloaded, or None if the request failed for some other
+        reason, so that it shouldn't change the limit
+        pause: the number of seconds that every request should wait (ex: from a Retry-After header), up to max_pause
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if overloaded:
+                self.stats['throttled'] += 1
+                if ticket == self._epoch:
+                    self.limit = max(self.min_concurrency, self.limit * self.decrease)
+                    self._epoch += 1
+            elif overloaded is not None:
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            if pause:
+                self._paused_until = max(self._paused_until, time.monotonic() + min(pause, self.max_pause))
+            self._condition.notify_all()
+
+
+# shared by every request that the client sends
+throttle = Throttle()
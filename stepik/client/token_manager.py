@@ -0,0 +1,55 @@
+import datetime
+import threading
+
+# renew a token when it's this close to expiring
+REFRESH_MARGIN = datetime.timedelta(seconds=60)
+
+# the last user whose token we checked, so that we can renew it after a 401
+_user = None
+# held while a token is renewed, since requests are sent from several threads
+# (and a refresh token can only be used once)
+_lock = threading.RLock()
+
+
+def _is_valid(user):
+    return user.access_token and datetime.datetime.now() < user.expiration - REFRESH_MARGIN
+
+
+def ensure_token(user):
+    """make sure the user has a valid access token, renewing it only when it is about to expire"""
+    global _user
+    _user = user
+    if _is_valid(user):
+        return
+    with _lock:
+        # another thread may have renewed it while we waited
+        if _is_valid(user):
+            return
+        user.sync_token()
+        if _is_valid(user):
+            return
+        if user.client_id and user.secret:
+            renew(user)
+
+
+def renew(user):
+    """get a new token, with the refresh token if we have one. otherwise, re-authenticate"""
+    from .auth import auth_user_password, refresh_client
+
+    with _lock:
+        if user.refresh_token and refresh_client(user):
+            return
+        auth_user_password(user)
+
+
+def renew_after_unauthorized(rejected_token=None):
+    """
+    the server rejected our token, so renew it. return the user or None if there isn't one
+    rejected_token: the token that was rejected. it isn't renewed again if another thread already replaced it
+    """
+    if _user is None or not (_user.client_id and _user.secret):
+        return None
+    with _lock:
+        if rejected_token is None or _user.access_token == rejected_token:
+            renew(_user)
+    return _user
@@ -1,12 +1,24 @@
+import os
+import json
+from array import array
+from bisect import bisect_left, bisect_right
 from pathlib import Path
 
+from .client import session, stepikclient
 from .filemanager import FileManager
-from .models.course import Course
-from .settings import COURSE_CACHE_FILE
+from .models.step import Step
+from .settings import COURSE_CACHE_FILE, COURSE_CACHE_FOLDER
+from .utils import batched_entities_loader
 
 
 class CourseCache():
-    def __init__(self, course=None, cache_path=COURSE_CACHE_FILE):
+    """
+    The lessons of each cached course, in course order
+    Each course is stored in its own shard: a binary array of lesson ids and a small JSON file
+    with its step and lesson indices. A pointer file records which course is the current one.
+    """
+
+    def __init__(self, course=None, cache_path=COURSE_CACHE_FOLDER):
         self.file_manager = FileManager()
         self.path = cache_path
         self.course = course
@@ -18,71 +30,158 @@ class CourseCache():
 
 
     def _initialize_empty_cache(self):
-        self.data = {'course': [self.course.id, self.course.title], 'lessons': []}
+        self.data = {'course': [self.course.id, self.course.title], 'lessons': array('I'), 'steps': {}, 'index': {}}
+
+
+    def _shard(self, course_id, suffix):
+        return self.path / "{}.{}".format(course_id, suffix)
+
+
+    def _read_current(self):
+        try:
+            with open(str(self.path / "current")) as file:
+                return int(file.read())
+        except (FileNotFoundError, ValueError):
+            return None
+
+
+    def _write(self, path, write):
+        """write a file atomically, so that a reader never sees half of it"""
+        tmp_path = path.with_name("{}.{}.tmp".format(path.name, os.getpid()))
+        with open(str(tmp_path), "wb") as file:
+            write(file)
+        os.replace(str(tmp_path), str(path))
 
 
     def load(self, user):
         """try to load the cache for a course. return success status"""
         if not self._loaded:
-            try:
-                data = self.file_manager.read_json(self.path)
-            except FileNotFoundError:
-                return False
+            self._migrate()
+            current = self._read_current()
             if self.course is None:
+                if current is None:
+                    return False
                 # we just create a dummy Course class here, since creating the actual
                 # class would require another http request
                 self.course = type('Course', (), {})()
-                self.course.id = data['current']
+                self.course.id = current
                 self.course.title = ""
                 self._initialize_empty_cache()
-            if data['current'] != self.course.id:
-                if str(self.course.id) not in data['courses']:
-                    return False
-                self._save_as_current(data)
-            self.data['lessons'] = list(map(int, data['courses'][str(self.course.id)]['lessons']))
+            lessons = array('I')
+            try:
+                with open(str(self._shard(self.course.id, "lessons")), "rb") as file:
+                    lessons.frombytes(file.read())
+                meta = self.file_manager.read_json(self._shard(self.course.id, "json"))
+            except FileNotFoundError:
+                return False
+            if current != self.course.id:
+                self._save_as_current()
+            self.data['lessons'] = lessons
+            self.data['steps'] = meta.get('steps', {})
+            self.data['index'] = meta.get('index') or self._index_lessons(lessons)
             self._loaded = True
         return self._loaded
 
 
-    def save(self):
+    def _migrate(self):
+        """split the single cache file of older versions into shards"""
+        if self.path != Path(COURSE_CACHE_FOLDER) or self.path.exists() or not os.path.exists(COURSE_CACHE_FILE):
+            return
         try:
-            data = self.file_manager.read_json(self.path)
-            data['courses'][str(self.course.id)] = self.data
-            data['current'] = self.course.id
-        except FileNotFoundError:
-            data = {'current': self.course.id, 'courses': {self.course.id: self.data}}
-        self.file_manager.write_json(self.path, data)
+            data = self.file_manager.read_json(COURSE_CACHE_FILE)
+        except ValueError:
+            return
+        for course_id, course_data in data['courses'].items():
+            course = type('Course', (), {'id': int(course_id), 'title': course_data['course'][1]})()
+            shard = CourseCache(course, self.path)
+            shard.data['lessons'] = array('I', map(int, course_data['lessons']))
+            shard.data['steps'] = course_data.get('steps', {})
+            shard.data['index'] = course_data.get('index') or self._index_lessons(shard.data['lessons'])
+            shard.save()
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._write(self.path / "current", lambda file: file.write(str(data['current']).encode()))
+        os.replace(COURSE_CACHE_FILE, COURSE_CACHE_FILE + ".migrated")
 
 
-    def _save_as_current(self, data=None):
-        if data is None:
-            data = self.file_manager.read_json(self.path)
-        data['current'] = self.course.id
-        self.file_manager.write_json(self.path, data)
+    def save(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        lessons = self.data['lessons']
+        if not isinstance(lessons, array):
+            lessons = self.data['lessons'] = array('I', lessons)
+        self._write(self._shard(self.course.id, "lessons"), lessons.tofile)
+        meta = {'course': self.data['course'], 'steps': self.data['steps'], 'index': self.data['index']}
+        self._write(self._shard(self.course.id, "json"), lambda file: file.write(json.dumps(meta).encode()))
+        self._save_as_current()
+
+
+    def _save_as_current(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._write(self.path / "current", lambda file: file.write(str(self.course.id).encode()))
 
 
     def update(self):
-        """create a cache of all of the lessons in the course"""
-        self.data['lessons'] = [
-            lesson.id for section in self.course.items()
-            for lesson in section.items()
-        ]
+        """create a cache of all of the lessons in the course. return the number of requests used"""
+        sent = session.stats()['requests']
+        lessons = self.course.lessons()
+        self.data['lessons'] = array('I', [lesson.id for lesson in lessons])
+        self.data['steps'] = self._index_steps(lessons)
+        self.data['index'] = self._index_lessons(self.data['lessons'])
         self.save()
+        return session.stats()['requests'] - sent
+
+
+    def _index_steps(self, lessons):
+        """record the id and type of every step in each lesson, so that we can navigate without the network"""
+        step_ids = [step_id for lesson in lessons for step_id in lesson.steps]
+        steps = batched_entities_loader(stepikclient.get_steps, self.course.user, "steps", step_ids, Step)
+        step_types = {step.id: step.block_name for step in steps}
+        return {
+            str(lesson.id): [[step_id, step_types.get(step_id)] for step_id in lesson.steps]
+            for lesson in lessons
+        }
+
+
+    @staticmethod
+    def _index_lessons(lessons):
+        """map each lesson id to its (sorted) positions in the course, since a lesson can appear more than once"""
+        index = {}
+        for lesson_pos, lesson_id in enumerate(lessons):
+            index.setdefault(str(lesson_id), []).append(lesson_pos)
+        return index
+
+
+    def has_lesson(self, lesson_id):
+        return str(lesson_id) in self.data['index']
+
+
+    def get_steps(self, lesson_id):
+        """return the [id, type] of each step in a lesson or None if the lesson isn't indexed"""
+        return self.data.get('steps', {}).get(str(lesson_id))
 
 
     def get_next_lesson(self, lesson_id, direction, last_pos=None):
+        """
+        get the lesson after (or before) this one and its position
+        raise a ValueError if there isn't one
+        """
+        lessons = self.data['lessons']
         # if the most recent position is not set, just make it be one of the extremes
         if last_pos is None:
-            last_pos = (0, len(self.data['lessons'])-1)[direction < 0]
-        # find the current position of this lesson in the list
-        # implemented differently depending on the provided direction
+            last_pos = (0, len(lessons)-1)[direction < 0]
+        positions = self.data['index'].get(str(lesson_id))
+        if not positions:
+            raise ValueError("lesson {} is not in the course".format(lesson_id))
+        # find the position of this lesson that is closest to the most recent position
+        # going forward, that's the first one at or after it. going back, it's the last one at or before it
         if direction > 0:
-            lesson_pos = self.data['lessons'].index(lesson_id, last_pos)
+            index = bisect_left(positions, last_pos)
         else:
-            last_pos = len(self.data['lessons']) - (last_pos + 1)
-            lesson_pos = self.data['lessons'][::-1].index(lesson_id, last_pos)
-            lesson_pos = len(self.data['lessons']) - (lesson_pos + 1)
+            index = bisect_right(positions, last_pos) - 1
+        if not 0 <= index < len(positions):
+            raise ValueError("lesson {} is not in this part of the course".format(lesson_id))
         # get the next lesson and its position
-        lesson_pos += direction
-        return self.data['lessons'][lesson_pos], lesson_pos
+        lesson_pos = positions[index] + direction
+        if not 0 <= lesson_pos < len(lessons):
+            raise ValueError("there are no more lessons in this direction")
+        return lessons[lesson_pos], lesson_pos
 
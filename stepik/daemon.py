@@ -0,0 +1,213 @@
+import os
+import sys
+import json
+import socket
+
+from .settings import DAEMON_SOCKET, DAEMON_TIMEOUT
+
+# commands that must run in the CLI's own process, since they are interactive or manage the daemon
+LOCAL_COMMANDS = ('auth', 'daemon')
+# the environment variables that the client sends along with a command (ex: STEPIK_TRACE for --trace)
+ENV_PREFIX = 'STEPIK_'
+# the environment variables that are only read when the daemon starts. if the client's are different,
+# it has to run the command itself
+STARTUP_ENV = ('STEPIK_HOST', 'STEPIK_APP_FOLDER')
+
+# whether this process is the daemon
+serving = False
+
+
+def _send(connection, message):
+    connection.sendall((json.dumps(message) + "\n").encode('utf-8'))
+
+
+def _messages(connection):
+    """yield each JSON message received over the connection"""
+    buffer = b''
+    while True:
+        data = connection.recv(65536)
+        if not data:
+            return
+        buffer += data
+        while b"\n" in buffer:
+            line, buffer = buffer.split(b"\n", 1)
+            yield json.loads(line.decode('utf-8'))
+
+
+def command_name(main, args):
+    """the name of the command that args would run, after any options of main, or None if there isn't one"""
+    import click
+
+    try:
+        ctx = main.make_context('stepik', list(args), resilient_parsing=True)
+    except click.ClickException:
+        return None
+    # newer versions of click deprecated protected_args
+    protected_args = getattr(ctx, '_protected_args', None)
+    if protected_args is None:
+        protected_args = ctx.protected_args
+    return protected_args[0] if protected_args else None
+
+
+def forward(main, args, socket_path=DAEMON_SOCKET, timeout=DAEMON_TIMEOUT):
+    """
+    run a command in the daemon, printing its output as it arrives
+    return the command's exit code or None if it couldn't be forwarded (ex: if the daemon isn't running,
+    or if it's still busy with another command after `timeout` seconds)
+    """
+    if '-' in args or not os.path.exists(socket_path):
+        return None
+    command = command_name(main, args)
+    if command is None or command in LOCAL_COMMANDS:
+        return None
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path)
+    except OSError:
+        connection.close()
+        return None
+    streams = {'stdout': sys.stdout, 'stderr': sys.stderr}
+    with connection:
+        # the daemon says it's ready once it gets to this connection. the command is only sent after that,
+        # so that it never runs twice (in the daemon, after we gave up on it, and here)
+        connection.settimeout(timeout)
+        messages = _messages(connection)
+        try:
+            if not next(messages, {}).get('ready'):
+                return None
+        except OSError:
+            return None
+        connection.settimeout(None)
+        _send(connection, {'args': args, 'cwd': os.getcwd(), 'color': sys.stdout.isatty(), 'env': _environment()})
+        for message in messages:
+            if message.get('local'):
+                return None
+            if 'exit' in message:
+                return message['exit']
+            streams[message['stream']].write(message['data'])
+            streams[message['stream']].flush()
+    sys.stderr.write("The daemon stopped before the command finished.\n")
+    return 1
+
+
+def _environment():
+    return {name: value for name, value in os.environ.items() if name.startswith(ENV_PREFIX)}
+
+
+def _set_environment(env):
+    """replace the STEPIK_* environment variables with these ones. return the ones that were replaced"""
+    replaced = _environment()
+    for name in replaced:
+        del os.environ[name]
+    os.environ.update(env)
+    return replaced
+
+
+def stop(socket_path=DAEMON_SOCKET):
+    """ask the daemon to stop. return whether it was running"""
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path)
+    except OSError:
+        return False
+    with connection:
+        _send(connection, {'stop': True})
+        for _ in _messages(connection):
+            pass
+    return True
+
+
+class _SocketStream:
+    """a text stream that forwards everything written to it to the client"""
+
+    def __init__(self, connection, name):
+        self.connection = connection
+        self.name = name
+
+    def write(self, data):
+        if isinstance(data, bytes):
+            data = data.decode('utf-8', 'replace')
+        if data:
+            _send(self.connection, {'stream': self.name, 'data': data})
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+def _run(main, request, connection):
+    """run a command with its output sent to the client. return its exit code"""
+    stdout, stderr, cwd = sys.stdout, sys.stderr, os.getcwd()
+    sys.stdout, sys.stderr = _SocketStream(connection, 'stdout'), _SocketStream(connection, 'stderr')
+    # options with an envvar (ex: --trace) read the client's environment, not the daemon's
+    env = _set_environment(request.get('env', {}))
+    try:
+        os.chdir(request['cwd'])
+        main.main(args=request['args'], prog_name='stepik', color=request['color'] or None)
+        return 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        sys.stderr.write(str(e.code) + "\n")
+        return 1
+    except Exception as e:
+        sys.stderr.write("Error: {!r}\n".format(e))
+        return 1
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+        _set_environment(env)
+        os.chdir(cwd)
+
+
+def serve(main, socket_path=DAEMON_SOCKET):
+    """
+    run commands sent by CLI clients, one at a time, until asked to stop
+    clients that have to wait too long for a command to finish run theirs in their own process
+    the session, token, and caches stay in memory between commands
+    """
+    global serving
+    serving = True
+    if stop(socket_path):
+        sys.stderr.write("Replaced the daemon that was already running.\n")
+    try:
+        os.remove(socket_path)
+    except FileNotFoundError:
+        pass
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # only this user should be able to run commands as them
+    umask = os.umask(0o177)
+    try:
+        server.bind(socket_path)
+    finally:
+        os.umask(umask)
+    server.listen()
+    try:
+        while True:
+            connection, _ = server.accept()
+            with connection:
+                try:
+                    _send(connection, {'ready': True})
+                    request = next(_messages(connection))
+                except (OSError, StopIteration, ValueError):
+                    # the client gave up waiting
+                    continue
+                if request.get('stop'):
+                    break
+                env = request.get('env', {})
+                try:
+                    if any(env.get(name) != os.environ.get(name) for name in STARTUP_ENV):
+                        _send(connection, {'local': True})
+                    else:
+                        _send(connection, {'exit': _run(main, request, connection)})
+                except OSError:
+                    # the client went away
+                    pass
+    finally:
+        server.close()
+        try:
+            os.remove(socket_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,90 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+
+
+class DiskCache:
+    """
+    A folder of JSON entries with size-bounded LRU eviction
+    An entry's modification time records when it was last used
+    """
+
+    def __init__(self, folder, max_bytes):
+        self.folder = Path(folder)
+        self.max_bytes = max_bytes
+        # the total size of the entries, measured when it's first needed and then kept up to date by put()
+        # so that every put doesn't have to scan the folder (other processes may make it drift until the next scan)
+        self._size = None
+
+    def _entries(self):
+        try:
+            return [
+                entry for entry in os.scandir(str(self.folder))
+                if entry.is_file() and not entry.name.endswith('.tmp')
+            ]
+        except FileNotFoundError:
+            return []
+
+    def _path(self, key):
+        return self.folder / hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(str(path)) as file:
+                entry = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+        if entry.get('key') != key:
+            return None
+        try:
+            os.utime(str(path))
+        except OSError:
+            pass
+        return entry['value']
+
+    def put(self, key, value):
+        self.folder.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_name(path.name + '.{}.tmp'.format(os.getpid()))
+        with open(str(tmp_path), 'w') as file:
+            json.dump({'key': key, 'value': value}, file)
+        if self._size is None:
+            self._size = sum(entry.stat().st_size for entry in self._entries())
+        try:
+            self._size -= os.stat(str(path)).st_size
+        except FileNotFoundError:
+            pass
+        self._size += os.stat(str(tmp_path)).st_size
+        os.replace(str(tmp_path), str(path))
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """remove the least recently used entries until the cache fits within max_bytes"""
+        entries = self._entries()
+        total = sum(entry.stat().st_size for entry in entries)
+        self._size = total
+        if total <= self.max_bytes:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            total -= entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+        self._size = total
+
+    def clear(self):
+        try:
+            entries = list(os.scandir(str(self.folder)))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            os.remove(entry.path)
+        self._size = 0
+        return len(entries)
@@ -3,6 +3,8 @@ import sys
 import json
 from pathlib import Path
 
+from . import trace
+
 
 class FileManager:
     """
@@ -39,18 +41,39 @@ class FileManager:
         ) as file:
             file.writelines(content)
 
+    def write_chunks(self, filename, chunks, append=False):
+        """write an iterable of bytes to a file, without holding all of them in memory"""
+        filename = self.get_name(filename)
+        if filename and filename != '-':
+            file = open(filename, "ab" if append else "wb")
+        else:
+            file = sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                file.write(chunk)
+        finally:
+            if file is sys.stdout.buffer:
+                file.flush()
+            else:
+                file.close()
+
     def write_json(self, filename, data):
         filename = self.get_name(filename)
-        with (
+        with trace.span('file', "write " + os.path.basename(filename or '-')) as span, (
             open(filename, "w") if filename and filename != '-' else sys.stdout
         ) as file:
             json.dump(data, file)
+            if trace.enabled and file is not sys.stdout:
+                span['bytes'] = file.tell()
 
     def read_json(self, filename):
         filename = self.get_name(filename)
-        return json.loads((
-            open(filename) if filename and filename != '-' else sys.stdin
-        ).read())
+        with trace.span('file', "read " + os.path.basename(filename or '-')) as span:
+            contents = (
+                open(filename) if filename and filename != '-' else sys.stdin
+            ).read()
+            span['bytes'] = len(contents)
+            return json.loads(contents)
 
     @staticmethod
     def is_local_file(filename):
@@ -1,11 +1,16 @@
 from stepik.client import stepikclient
 from .entity import Entity
+from .lesson import Lesson
 from .section import Section
+from .unit import Unit
 from .user import User
-from ..utils import entities_loader, all_entities_loader
+from ..utils import entities_loader, entities_iterator, all_entities_loader, all_entities_iterator, \
+    batched_entities_loader
 
 
 class Course(Entity):
+    __slots__ = ('title', 'sections')
+
     def _load(self):
         course_json = stepikclient.get_course(self.user, self.id)
 
@@ -16,6 +21,32 @@ class Course(Entity):
         user = User()
         return all_entities_loader(stepikclient.get_courses, user, 'courses', Section, enrolled='true')
 
+    @staticmethod
+    def iter_all():
+        """like all, but yield the courses as they arrive"""
+        user = User()
+        return all_entities_iterator(stepikclient.get_courses, user, 'courses', Section, enrolled='true')
+
     def items(self):
         return entities_loader(stepikclient.get_sections, self.user, "sections", self.sections, Section)
 
+    def iter_items(self):
+        """like items, but yield the sections as they arrive"""
+        return entities_iterator(stepikclient.get_sections, self.user, "sections", self.sections, Section)
+
+    def lessons(self):
+        """load every lesson in the course, one tree level at a time, in course order"""
+        unit_ids = [unit_id for section in self.items() for unit_id in section.units]
+        units = batched_entities_loader(stepikclient.get_units, self.user, "units", unit_ids, Unit)
+        lesson_ids = [unit.lesson for unit in units]
+        return batched_entities_loader(stepikclient.get_lessons, self.user, "lessons", lesson_ids, Lesson)
+
+    async def items_async(self, client):
+        """like items, but with an AsyncStepikClient"""
+        return [Section(self.user, section) for section in await client.get_sections(self.sections)]
+
+    async def lessons_async(self, client):
+        """like lessons, but with an AsyncStepikClient"""
+        unit_ids = [unit_id for section in await self.items_async(client) for unit_id in section.units]
+        lesson_ids = [unit['lesson'] for unit in await client.get_units(unit_ids)]
+        return [Lesson(self.user, lesson) for lesson in await client.get_lessons(lesson_ids)]
@@ -1,15 +1,53 @@
+import json
+
+
 class Entity:
+    """
+    An entity from the Stepik API
+    The fields in __slots__ are kept as attributes. The rest of the payload is kept as compact JSON bytes,
+    and a field is decoded from it only when it's accessed, so that large courses don't take up much memory
+    """
+    __slots__ = ('user', 'id', '_raw')
+
+    # the fields that subclasses keep as attributes (computed from their __slots__)
+    _fields = frozenset(('id',))
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        fields = set(cls._fields)
+        fields.update(cls.__dict__.get('__slots__', ()))
+        cls._fields = frozenset(fields)
+
     def __init__(self, user, data):
         self.user = user
+        self._raw = b''
 
         self._load_from_data(data)
 
     def __str__(self):
         return "{}\t{}".format(self.id, self.title)
 
+    def __getattr__(self, name):
+        # only called for fields that aren't attributes
+        if name.startswith('_'):
+            raise AttributeError(name)
+        raw = self._extra()
+        if name not in raw:
+            raise AttributeError("{} has no field {}".format(type(self).__name__, name))
+        return raw[name]
+
+    def _extra(self):
+        """the fields that aren't attributes"""
+        return json.loads(self._raw.decode('utf-8')) if self._raw else dict()
+
     def _load_from_data(self, data):
+        extra = self._extra()
         for key in data:
-            self.__dict__[key] = data[key]
+            if key in self._fields:
+                setattr(self, key, data[key])
+            else:
+                extra[key] = data[key]
+        self._raw = json.dumps(extra, separators=(',', ':')).encode('utf-8') if extra else b''
 
     def _load(self):
         pass
@@ -1,10 +1,12 @@
 from stepik.client import stepikclient
 from .entity import Entity
 from .step import Step
-from ..utils import entities_loader
+from ..utils import entities_loader, entities_iterator
 
 
 class Lesson(Entity):
+    __slots__ = ('title', 'steps')
+
     def _load(self):
         json = stepikclient.get_lesson(self.user, self.id)
 
@@ -12,3 +14,11 @@ class Lesson(Entity):
 
     def items(self):
         return entities_loader(stepikclient.get_steps, self.user, "steps", self.steps, Step)
+
+    def iter_items(self):
+        """like items, but yield the steps as they arrive"""
+        return entities_iterator(stepikclient.get_steps, self.user, "steps", self.steps, Step)
+
+    async def items_async(self, client):
+        """like items, but with an AsyncStepikClient"""
+        return [Step(self.user, step) for step in await client.get_steps(self.steps)]
@@ -2,10 +2,12 @@ from stepik.client import stepikclient
 from .entity import Entity
 from .lesson import Lesson
 from .unit import Unit
-from ..utils import entities_loader
+from ..utils import entities_loader, entities_iterator
 
 
 class Section(Entity):
+    __slots__ = ('title', 'units')
+
     def _load(self):
         json = stepikclient.get_section(self.user, self.id)
 
@@ -15,7 +17,20 @@ class Section(Entity):
         return entities_loader(stepikclient.get_units, self.user, "units", self.units, Unit)
 
     def items(self):
+        return list(self.iter_items())
+
+    def iter_items(self):
+        """like items, but yield the lessons as they arrive"""
         units = self.units_set()
 
         ids = list(map(lambda unit: unit.lesson, units))
-        return entities_loader(stepikclient.get_lessons, self.user, "lessons", ids, Lesson)
\ No newline at end of file
+        return entities_iterator(stepikclient.get_lessons, self.user, "lessons", ids, Lesson)
+
+    async def units_set_async(self, client):
+        """like units_set, but with an AsyncStepikClient"""
+        return [Unit(self.user, unit) for unit in await client.get_units(self.units)]
+
+    async def items_async(self, client):
+        """like items, but with an AsyncStepikClient"""
+        ids = [unit.lesson for unit in await self.units_set_async(client)]
+        return [Lesson(self.user, lesson) for lesson in await client.get_lessons(ids)]
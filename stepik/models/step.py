@@ -2,5 +2,13 @@ from .entity import Entity
 
 
 class Step(Entity):
+    # the block (with the step's text) is large, so only its name is kept as an attribute
+    __slots__ = ('position', 'block_name')
+
     def __str__(self):
-        return "{}\t{}\t{}".format(self.id, self.position, self.block['name'])
+        return "{}\t{}\t{}".format(self.id, self.position, self.block_name)
+
+    def _load_from_data(self, data):
+        if 'block' in data:
+            self.block_name = data['block']['name']
+        super()._load_from_data(data)
@@ -2,4 +2,4 @@ from .entity import Entity
 
 
 class Unit(Entity):
-    pass
+    __slots__ = ('lesson',)
@@ -1,20 +1,36 @@
+import os
 import datetime
 
-from stepik.client.auth import auth_user_password
 from stepik.client.consts import GRAND_TYPE_CREDENTIALS
 from ..filemanager import FileManager
 from ..settings import CLIENT_FILE, CLIENT_ID, CLIENT_SECRET
 
+# the contents of the client file, kept in memory for the rest of the process
+# it is read again only if the file changes (ex: if another process refreshed the token)
+_client_data = {'mtime': None, 'data': {}}
+
+
+def _read_client_data():
+    try:
+        mtime = os.stat(CLIENT_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    if _client_data['mtime'] != mtime:
+        try:
+            _client_data['data'] = User.file_manager.read_json(CLIENT_FILE)
+        except FileNotFoundError:
+            return {}
+        _client_data['mtime'] = mtime
+    return dict(_client_data['data'])
+
 
 class User:
     file_manager = FileManager()
 
     def __init__(self):
-        try:
-            data = self.file_manager.read_json(CLIENT_FILE)
-        except FileNotFoundError:
-            data = {}
+        self._load(_read_client_data())
 
+    def _load(self, data):
         self.client_id = data.get('client_id', CLIENT_ID)
         self.secret = data.get('client_secret', CLIENT_SECRET)
         self.username = data.get('username', 'Unknown')
@@ -26,12 +42,16 @@ class User:
             self.expiration = datetime.datetime.fromisoformat(self.expiration)
         self.step_type = data.get('step_type', 'all')
 
-        if self.expiration < datetime.datetime.now() and self.client_id and self.secret:
-            auth_user_password(self)
-
-        self.save()
+    def sync_token(self):
+        """adopt the token in the client file if it is newer than ours (ex: another User refreshed it)"""
+        data = _read_client_data()
+        if 'expiration' in data and datetime.datetime.fromisoformat(data['expiration']) > self.expiration:
+            self.access_token = data.get('access_token', '')
+            self.refresh_token = data.get('refresh_token', '')
+            self.expiration = datetime.datetime.fromisoformat(data['expiration'])
 
     def save(self):
+        """write the client file, but only if something has changed"""
         data = dict()
         data['client_id'] = self.client_id
         data['client_secret'] = self.secret
@@ -42,4 +62,8 @@ class User:
         data['expiration'] = self.expiration.isoformat()
         data['step_type'] = self.step_type
 
+        if data == _read_client_data():
+            return
         self.file_manager.write_json(CLIENT_FILE, data)
+        _client_data['data'] = data
+        _client_data['mtime'] = os.stat(CLIENT_FILE).st_mtime_ns
@@ -16,13 +16,23 @@ def update_step_position(position, steps, direction):
         raise ValueError
     return position
 
-def navigate(user, step_type, direction, data=None, course_cache=None):
+def lesson_steps(user, lesson_id, course_cache=None):
+    """get the [id, type] of each step in a lesson, from the course cache if it has them"""
+    if course_cache is not None:
+        steps = course_cache.get_steps(lesson_id)
+        if steps is not None:
+            return steps
+    lesson = Lesson.get(user, lesson_id)
+    return [[step.id, step.block_name] for step in lesson.items()]
+
+
+def navigate(user, step_type, direction, data=None, course_cache=None, prefetch=False):
     if data is None:
         data = attempt_cache.get_data()
     try:
         position = data['current_position']
-        lesson = Lesson.get(user, data['lesson_id'])
-        steps = lesson.items()
+        lesson_id = int(data['lesson_id'])
+        steps = lesson_steps(user, lesson_id, course_cache)
     except KeyError:
         return False
 
@@ -40,20 +50,25 @@ def navigate(user, step_type, direction, data=None, course_cache=None):
             else:
                 try:
                     lesson_id, lesson_pos = course_cache.get_next_lesson(
-                        lesson.id, direction, lesson_pos
+                        lesson_id, direction, lesson_pos
                     )
                 except ValueError:
                     break
-                lesson = Lesson.get(user, lesson_id)
-                data['lesson_id'] = lesson.id
-                steps = lesson.items()
-                data['steps'] = [s.id for s in steps]
+                data['lesson_id'] = lesson_id
+                steps = lesson_steps(user, lesson_id, course_cache)
+                data['steps'] = [step_id for step_id, _ in steps]
                 position = (0, len(steps)+1)[direction < 0]
                 continue
-        step = steps[position-1]
-        if step_type == "all" or step.block['name'] == step_type:
+        _, block_name = steps[position-1]
+        if step_type == "all" or block_name == step_type:
             data['current_position'] = position
-            attempt_cache.set_data(data)
+            attempt_cache.set_position(
+                lesson_id=data['lesson_id'], current_position=position, steps=data['steps']
+            )
+            if prefetch:
+                from . import prefetch as prefetcher
+
+                prefetcher.start(user, data, step_type, direction, course_cache)
             return True
     return False
 
@@ -61,22 +76,22 @@ def navigate(user, step_type, direction, data=None, course_cache=None):
 def _validate_nav(user, data):
     """check that it's possible to navigate through this course"""
     if cached_lessons.load(user):
-        if int(data['lesson_id']) not in cached_lessons.data['lessons']:
+        if not cached_lessons.has_lesson(data['lesson_id']):
             exit_util("Unable to locate the current lesson within the course cache. Have you set the course using the 'course' command?")
     else:
         exit_util("Please first set the course ID via the 'course' command.")
 
 
-def next_step(user, step_type):
+def next_step(user, step_type, prefetch=False):
     data = attempt_cache.get_data()
     _validate_nav(user, data)
-    return navigate(user, step_type, FORWARD, data, cached_lessons)
+    return navigate(user, step_type, FORWARD, data, cached_lessons, prefetch)
 
 
-def prev_step(user, step_type):
+def prev_step(user, step_type, prefetch=False):
     data = attempt_cache.get_data()
     _validate_nav(user, data)
-    return navigate(user, step_type, BACK, data, cached_lessons)
+    return navigate(user, step_type, BACK, data, cached_lessons, prefetch)
 
 def create_course_cache(course):
     global cached_lessons
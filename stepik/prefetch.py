@@ -0,0 +1,129 @@
+import os
+import sys
+
+from . import attempt_cache
+from .client import mirror, response_cache, stepikclient
+from .client.consts import LESSONS, LESSONS_PK, STEPS, STEPS_PK
+from .course_cache import CourseCache
+from .models.user import User
+from .settings import CACHE_TTL, PREFETCH_BUDGET, PREFETCH_STEPS
+from .utils import raise_errors
+
+# after "next" or "prev", the user usually views the new step (ex: with "text" or "lang") or navigates again
+# so the steps that they're likely to view are fetched ahead of time, into the response cache
+
+
+def plan(data, step_type, direction, course_cache=None, count=None):
+    """
+    choose what to prefetch: the current step, and the next `count` steps of step_type in the direction of navigation
+    return the ids of those steps and of the lessons (other than the current one) that they belong to
+    """
+    if count is None:
+        count = PREFETCH_STEPS
+    position = data['current_position']
+    lesson_id = int(data['lesson_id'])
+    step_ids, lesson_ids = [data['steps'][position-1]], []
+    if course_cache is None:
+        return step_ids, lesson_ids
+    steps = course_cache.get_steps(lesson_id)
+    lesson_pos = None
+    while steps is not None and len(step_ids) <= count:
+        position += direction
+        if position > len(steps) or position < 1:
+            try:
+                lesson_id, lesson_pos = course_cache.get_next_lesson(lesson_id, direction, lesson_pos)
+            except ValueError:
+                break
+            steps = course_cache.get_steps(lesson_id)
+            if steps is not None:
+                position = (0, len(steps)+1)[direction < 0]
+            continue
+        step_id, block_name = steps[position-1]
+        if step_type == "all" or block_name == step_type:
+            step_ids.append(step_id)
+            if lesson_id != int(data['lesson_id']) and lesson_id not in lesson_ids:
+                lesson_ids.append(lesson_id)
+    return step_ids, lesson_ids
+
+
+def _is_cached(user, kind, url, entity_id):
+    if mirror.lookup(kind, entity_id) is not None:
+        return True
+    entry = response_cache.lookup(user, url)
+    return entry is not None and response_cache.is_fresh(entry, CACHE_TTL[kind])
+
+
+def warm(user, step_ids, lesson_ids, budget=None):
+    """
+    put whichever of these steps and lessons aren't cached yet into the response cache, using ids[] requests
+    stop once `budget` requests have been sent. return the number of requests that were sent
+    """
+    if budget is None:
+        budget = PREFETCH_BUDGET
+    sent = 0
+    for kind, ids, url, url_template in (('steps', step_ids, STEPS, STEPS_PK), ('lessons', lesson_ids, LESSONS, LESSONS_PK)):
+        missing = [entity_id for entity_id in ids if not _is_cached(user, kind, url_template.format(entity_id), entity_id)]
+        page_index = 1
+        while missing and sent < budget:
+            page = stepikclient.get_entities_with_ids(user, missing, page_index, url, mirrored=False)
+            sent += 1
+            for entity in page[kind]:
+                # cache it the way that get_step and get_lesson would have
+                response_cache.store(
+                    user, url_template.format(entity['id']),
+                    {'meta': {'page': 1, 'has_next': False}, kind: [entity]}, {}
+                )
+            if not page['meta']['has_next']:
+                break
+            page_index += 1
+    return sent
+
+
+def prefetch(user, data, step_type, direction, course_cache=None):
+    # prefetching is only an optimization, so it should never report errors
+    # (in the daemon, they would be printed in the output of whichever command is running)
+    try:
+        with raise_errors():
+            warm(user, *plan(data, step_type, direction, course_cache))
+    except Exception:
+        pass
+
+
+def start(user, data, step_type, direction, course_cache=None):
+    """
+    prefetch in the background: in a thread, if we're running in the daemon, or in a detached process otherwise,
+    so that the command that navigated doesn't have to wait for it
+    """
+    from . import daemon
+
+    if not response_cache.enabled:
+        return
+    if daemon.serving:
+        import threading
+
+        threading.Thread(
+            target=prefetch, args=(user, dict(data), step_type, direction, course_cache), daemon=True
+        ).start()
+        return
+    import subprocess
+
+    # the process reads the position and the course cache that we just saved
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, (root, env.get('PYTHONPATH'))))
+    subprocess.Popen(
+        [sys.executable, "-m", __name__, step_type, str(direction)], env=env, start_new_session=True,
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def _main(step_type, direction):
+    user = User()
+    course_cache = CourseCache()
+    if not course_cache.load(user):
+        course_cache = None
+    prefetch(user, attempt_cache.get_data(), step_type, direction, course_cache)
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1], int(sys.argv[2]))
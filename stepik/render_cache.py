@@ -0,0 +1,56 @@
+import hashlib
+
+from . import trace
+from .disk_cache import DiskCache
+from .settings import RENDER_CACHE_FOLDER, RENDER_CACHE_SIZE
+
+_cache = DiskCache(RENDER_CACHE_FOLDER, RENDER_CACHE_SIZE)
+
+
+def _key(kind, entity_id, html):
+    # the hash makes sure that an entity is rendered again once its html changes
+    return "{} {} {}".format(kind, entity_id, hashlib.sha1(html.encode('utf-8')).hexdigest())
+
+
+def _html2text(html):
+    import html2text
+
+    with trace.span('render', 'html2text') as span:
+        span['bytes'] = len(html)
+        return html2text.html2text(html)
+
+
+def render(kind, entity_id, html):
+    """return the html of an entity (ex: a step's text) as markdown, rendering it only if it isn't cached"""
+    key = _key(kind, entity_id, html)
+    text = _cache.get(key)
+    if text is None:
+        text = _html2text(html)
+        _cache.put(key, text)
+    return text
+
+
+def prerender(kind, pages, workers=None):
+    """
+    render every page that isn't cached yet, in a pool of processes
+    pages: a list of (entity_id, html) pairs
+    return the number of pages that were rendered
+    """
+    missing = [(entity_id, html) for entity_id, html in pages if _cache.get(_key(kind, entity_id, html)) is None]
+    if len(missing) < 2:
+        # starting the processes would take longer than rendering
+        for entity_id, html in missing:
+            render(kind, entity_id, html)
+        return len(missing)
+    # imported here, since it's slow to import and most commands don't need it
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        texts = pool.map(_html2text, [html for _, html in missing])
+        for (entity_id, html), text in zip(missing, texts):
+            _cache.put(_key(kind, entity_id, html), text)
+    return len(missing)
+
+
+def clear():
+    return _cache.clear()
@@ -1,8 +1,86 @@
 import os 
 
-APP_FOLDER = os.path.dirname(os.path.realpath(__file__))+"/.stepik"
+# STEPIK_APP_FOLDER can point the CLI somewhere else (ex: a throwaway folder for benchmarks)
+APP_FOLDER = os.environ.get("STEPIK_APP_FOLDER", os.path.dirname(os.path.realpath(__file__))+"/.stepik")
+COURSE_CACHE_FOLDER = APP_FOLDER + "/course_cache"
+# where older versions cached every course in a single file
 COURSE_CACHE_FILE = APP_FOLDER + "/course_cache_file"
 CLIENT_FILE = APP_FOLDER + "/client_file"
 ATTEMPT_FILE = APP_FOLDER + "/attempt_file"
 CLIENT_ID = ""
 CLIENT_SECRET = ""
+
+# on-disk cache of step texts that were rendered as markdown
+RENDER_CACHE_FOLDER = APP_FOLDER + "/render_cache"
+RENDER_CACHE_SIZE = 10 * 1024 * 1024
+
+# prefetching the steps after the current one, with next --prefetch or prev --prefetch
+PREFETCH_STEPS = 3
+# the most requests that a prefetch may send
+PREFETCH_BUDGET = 2
+
+# the offline copies of courses made by the sync command
+MIRROR_FOLDER = APP_FOLDER + "/mirror"
+
+# http connection pooling
+POOL_SIZE = 10
+REQUEST_TIMEOUT = 30
+
+# limits on the requests sent to the Stepik API, shared by every thread
+# the number of requests in flight adapts between these, depending on whether the server is overloaded
+MIN_CONCURRENCY = 1
+MAX_CONCURRENCY = POOL_SIZE
+# requests per second, and the number that can be sent at once after a quiet period
+RATE_LIMIT = 50
+RATE_BURST = 50
+# GET requests are retried after a failed connection or a 429 or 5xx response
+REQUEST_RETRIES = 3
+RETRY_BACKOFF = 0.5
+RETRY_MAX_WAIT = 60
+
+# hedging GET requests (with the --hedge option): if a response takes longer than HEDGE_PERCENTILE percent of
+# recent responses did, the request is sent again, and whichever response arrives first is used
+HEDGE_PERCENTILE = 95
+# the delay before a second request, until HEDGE_MIN_SAMPLES latencies have been measured
+HEDGE_DELAY = 0.5
+HEDGE_MIN_DELAY = 0.05
+HEDGE_SAMPLES = 200
+HEDGE_MIN_SAMPLES = 20
+HEDGE_FILE = APP_FOLDER + "/hedging.json"
+
+# on-disk cache of API responses
+RESPONSE_CACHE_FOLDER = APP_FOLDER + "/response_cache"
+RESPONSE_CACHE_SIZE = 50 * 1024 * 1024
+# the number of seconds that a cached response can be used without revalidating it
+CACHE_TTL = {
+    'courses': 24 * 60 * 60,
+    'sections': 24 * 60 * 60,
+    'lessons': 60 * 60,
+    'steps': 60 * 60,
+}
+
+# polling for the verdicts of submissions
+POLL_INTERVAL = 0.25
+POLL_BACKOFF = 1.5
+POLL_MAX_INTERVAL = 5
+POLL_JITTER = 0.1
+POLL_DEADLINE = 300
+POLL_BATCH_SIZE = 20
+
+# streaming downloads of datasets
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_RETRIES = 3
+
+# the largest solution file that can be submitted, in bytes
+SUBMISSION_SIZE_LIMIT = 64 * 1024 * 1024
+
+# the database that stores the current position and the dataset attempts
+STATE_DB = APP_FOLDER + "/state.db"
+# the number of seconds to keep an attempt after it expires
+ATTEMPT_RETENTION = 24 * 60 * 60
+
+# the socket that the background daemon listens on
+DAEMON_SOCKET = APP_FOLDER + "/daemon.sock"
+# the number of seconds to wait for the daemon to take a command, before running it in the CLI's own process
+# (the daemon runs one command at a time, so it may be busy with a long one, like submit or sync)
+DAEMON_TIMEOUT = 0.5
@@ -0,0 +1,138 @@
+import os
+import re
+import sys
+import time
+import threading
+import contextlib
+from urllib.parse import urlsplit
+
+# set to True to record spans (ex: via the --trace option or the STEPIK_TRACE environment variable)
+enabled = False
+
+# every span recorded since start(), as (category, name, start, seconds, thread id, args)
+events = []
+
+_origin = time.perf_counter()
+_numbers = re.compile(r'/\d+')
+# the connection stats of the session when recording began
+_connections = None
+
+
+def start():
+    """forget the spans recorded so far and begin recording new ones"""
+    from .client import session
+
+    global enabled, _origin, _connections
+    del events[:]
+    _origin = time.perf_counter()
+    _connections = session.stats()
+    enabled = True
+
+
+def stop():
+    global enabled
+    enabled = False
+
+
+def url_template(url):
+    """strip the ids and the query values from a url, so that similar requests are grouped together"""
+    url = urlsplit(url)
+    template = _numbers.sub('/{id}', url.path)
+    if url.query:
+        keys = []
+        for param in url.query.split('&'):
+            key = param.split('=')[0]
+            if key not in keys:
+                keys.append(key)
+        template += '?' + '&'.join(keys)
+    return template
+
+
+@contextlib.contextmanager
+def span(category, name):
+    """
+    time the block of code and record it under the category and name
+    the block can add details (ex: the status or the number of bytes) to the dictionary that it receives
+    """
+    args = dict()
+    if not enabled:
+        yield args
+        return
+    began = time.perf_counter()
+    try:
+        yield args
+    finally:
+        events.append((category, name, began - _origin, time.perf_counter() - began, threading.get_ident(), args))
+
+
+def summary():
+    """aggregate the spans by their category and name"""
+    rows = dict()
+    for category, name, began, seconds, thread, args in events:
+        row = rows.setdefault((category, name), {
+            'calls': 0, 'seconds': 0, 'max': 0, 'bytes': 0, 'hits': 0, 'misses': 0, 'statuses': set()
+        })
+        row['calls'] += 1
+        row['seconds'] += seconds
+        row['max'] = max(row['max'], seconds)
+        row['bytes'] += args.get('bytes', 0)
+        if 'cache' in args:
+            row['hits' if args['cache'] != 'miss' else 'misses'] += 1
+        if 'status' in args:
+            row['statuses'].add(args['status'])
+    return rows
+
+
+def format_summary(rows):
+    lines = ["{:<10}{:<44}{:>6}{:>10}{:>9}{:>9}{:>11}{:>6}{:>6}  {}".format(
+        'category', 'name', 'calls', 'total ms', 'mean ms', 'max ms', 'bytes', 'hits', 'miss', 'status'
+    )]
+    for (category, name), row in sorted(rows.items(), key=lambda item: -item[1]['seconds']):
+        lines.append("{:<10}{:<44}{:>6}{:>10.1f}{:>9.1f}{:>9.1f}{:>11}{:>6}{:>6}  {}".format(
+            category, name[:43], row['calls'], row['seconds'] * 1000, row['seconds'] * 1000 / row['calls'],
+            row['max'] * 1000, row['bytes'], row['hits'], row['misses'],
+            ",".join(map(str, sorted(row['statuses'])))
+        ))
+    return "\n".join(lines)
+
+
+def connections():
+    """the number of requests sent since start(), and the connections that were opened or reused for them"""
+    from .client import session
+
+    now = session.stats()
+    before = _connections or dict.fromkeys(now, 0)
+    return {key: max(now[key] - before[key], 0) for key in now}
+
+
+def format_connections(stats):
+    return "connections: {} opened, {} reused, for {} requests".format(
+        stats['opened'], stats['reused'], stats['requests']
+    )
+
+
+def chrome_trace():
+    """the spans in the Chrome trace event format, which chrome://tracing and Perfetto can open"""
+    pid = os.getpid()
+    return {'traceEvents': [
+        {
+            'name': name, 'cat': category, 'ph': 'X', 'pid': pid, 'tid': thread,
+            'ts': round(began * 10 ** 6), 'dur': round(seconds * 10 ** 6), 'args': args
+        } for category, name, began, seconds, thread, args in events
+    ]}
+
+
+def report(trace_file=None):
+    """print the summary table, write the spans to trace_file (if provided), and stop recording"""
+    import json
+
+    stop()
+    if not events:
+        return
+    print(format_summary(summary()), file=sys.stderr)
+    stats = connections()
+    if stats['requests']:
+        print(format_connections(stats), file=sys.stderr)
+    if trace_file is not None:
+        with open(str(trace_file), "w") as file:
+            json.dump(chrome_trace(), file, default=str)
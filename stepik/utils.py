@@ -1,12 +1,15 @@
 import re
 import sys
+import threading
+from collections import deque
+from contextlib import contextmanager
 
 import click
 
-
-def exit_util(message, exit_code=1):
-    click.secho(message, fg="red", bold=True, err=True)
-    sys.exit(exit_code)
+# the number of pages that can be fetched ahead of time
+PAGE_WORKERS = 4
+# the number of ids to request at once when loading entities in bulk
+BATCH_SIZE = 100
 
 
 def get_lesson_id(step_url):
@@ -27,34 +30,144 @@ def prepare_ids(ids):
     return "&".join(map(lambda id: "ids[]=" + str(id), ids))
 
 
+class ExitError(Exception):
+    """raised by exit_util in place of exiting, within raise_errors()"""
+
+    def __init__(self, message, exit_code=1):
+        super().__init__(message)
+        self.exit_code = exit_code
+
+
+_local = threading.local()
+
+
+def exit_util(message, exit_code=1):
+    if getattr(_local, 'raise_errors', False):
+        raise ExitError(message, exit_code)
+    click.secho(message, fg="red", bold=True, err=True)
+    sys.exit(exit_code)
+
+
+@contextmanager
+def raise_errors():
+    """within this thread, make exit_util quietly raise an ExitError instead of exiting"""
+    previous = getattr(_local, 'raise_errors', False)
+    _local.raise_errors = True
+    try:
+        yield
+    finally:
+        _local.raise_errors = previous
+
+
+def _speculative_fetch(fetch, page_index):
+    # a page that was fetched ahead of time might not exist, so stay quiet
+    with raise_errors():
+        return fetch(page_index)
+
+
+def pages_loader(fetch, page_count=None, workers=None):
+    """
+    yield each page returned by fetch(page_index), in order
+    after the first page, up to `workers` of the following pages are fetched ahead
+    page_count can estimate the number of pages from the first one, to avoid fetching past the end
+    """
+    if workers is None:
+        workers = PAGE_WORKERS
+    page = fetch(1)
+    yield page
+    if not page['meta']['has_next']:
+        return
+    last_page = None if page_count is None else page_count(page)
+    page_index = 2
+    if workers < 2:
+        while True:
+            page = fetch(page_index)
+            yield page
+            if not page['meta']['has_next']:
+                return
+            page_index += 1
+    # imported here, since it's slow to import and local commands don't need it
+    from concurrent.futures import ThreadPoolExecutor
+
+    pending = deque()
+    next_index = page_index
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            while True:
+                while len(pending) < workers and (last_page is None or next_index <= last_page):
+                    pending.append((next_index, pool.submit(_speculative_fetch, fetch, next_index)))
+                    next_index += 1
+                if pending:
+                    page_index, future = pending.popleft()
+                    try:
+                        page = future.result()
+                    except Exception:
+                        # retry in the foreground so that real errors are reported
+                        page = fetch(page_index)
+                else:
+                    # the server has more pages than we expected
+                    page = fetch(next_index)
+                    next_index += 1
+                yield page
+                if not page['meta']['has_next']:
+                    return
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def entities_iterator(getter, user, key, ids, entity_class=None):
+    """yield the entities with these ids as each page of them arrives (as their JSON, without an entity_class)"""
+    def fetch(page_index):
+        return getter(user, ids, page_index)
+
+    def page_count(first_page):
+        # we know how many ids we asked for, so we know how many pages to expect
+        if not first_page[key]:
+            return None
+        return -(-len(ids) // len(first_page[key]))
+
+    for page in pages_loader(fetch, page_count):
+        for entity in page[key]:
+            yield entity if entity_class is None else entity_class(user, entity)
+
+
 def entities_loader(getter, user, key, ids, entity_class):
-    has_next = True
-    page_index = 1
-    entities = list()
+    return list(entities_iterator(getter, user, key, ids, entity_class))
+
+
+def batched_entities_iterator(getter, user, key, ids, entity_class=None, batch_size=None):
+    """
+    yield the entities with these ids as they arrive, using a few large ids[] requests
+    each entity is only yielded once, even if its id is repeated
+    """
+    if batch_size is None:
+        batch_size = BATCH_SIZE
+    unique_ids = list(dict.fromkeys(ids))
+    for start in range(0, len(unique_ids), batch_size):
+        yield from entities_iterator(getter, user, key, unique_ids[start:start+batch_size], entity_class)
+
+
+def batched_entities_loader(getter, user, key, ids, entity_class, batch_size=None):
+    """
+    load the entities with these ids using a few large ids[] requests
+    the entities are returned in the same order as their ids
+    """
+    loaded = {
+        entity.id: entity for entity in batched_entities_iterator(getter, user, key, ids, entity_class, batch_size)
+    }
+    return [loaded[entity_id] for entity_id in ids if entity_id in loaded]
+
 
-    while has_next:
-        page = getter(user, ids, page_index)
-        has_next = page['meta']['has_next']
-        page_index += 1
-        page = page[key]
-        entities_list = list(map(lambda entity: entity_class(user, entity), page))
-        entities.extend(entities_list)
+def all_entities_iterator(getter, user, key, entity_class, **kwargs):
+    """yield every entity that the getter lists, as each page of them arrives"""
+    def fetch(page_index):
+        return getter(user, page=page_index, **kwargs)
 
-    return entities
+    for page in pages_loader(fetch):
+        for entity in page[key]:
+            yield entity_class(user, entity)
 
 
 def all_entities_loader(getter, user, key, entity_class, **kwargs):
-    has_next = True
-    page_index = 1
-    entities = list()
-
-    while has_next:
-        kwargs['page'] = page_index
-        page = getter(user, **kwargs)
-        has_next = page['meta']['has_next']
-        page_index += 1
-        page = page[key]
-        entities_list = list(map(lambda entity: entity_class(user, entity), page))
-        entities.extend(entities_list)
-
-    return entities
+    return list(all_entities_iterator(getter, user, key, entity_class, **kwargs))
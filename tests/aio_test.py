@@ -0,0 +1,94 @@
+import os
+import sys
+import asyncio
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from stepik.client import aio
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_stepik import FakeCourse, FakeStepik
+
+
+@unittest.skipIf(aio.aiohttp is None, "aiohttp isn't installed")
+class Test(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.course = FakeCourse(sections=2, lessons=5, steps=5)
+        cls.server = FakeStepik(cls.course, latency=0, evaluation_polls=0, dataset_size=10 ** 5).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def setUp(self):
+        self.server.reset_counts()
+        api = self.server.host + "api"
+        urls = {
+            'COURSES_PK': api + "/courses/{}", 'STEPS_PK': api + "/steps/{}", 'STEPS': api + "/steps/",
+            'LESSONS': api + "/lessons/", 'ATTEMPTS': api + "/attempts", 'SUBMISSIONS': api + "/submissions/",
+            'STEPIK_API_URL': api,
+        }
+        self.headers = mock.Mock(return_value={'Authorization': 'Bearer token'})
+        patcher = mock.patch.multiple(aio, get_headers=self.headers, **urls)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _run(self, function):
+        """call function(client) in a new event loop and return its result"""
+        async def run():
+            async with aio.AsyncStepikClient(None, limit=4) as client:
+                return await function(client)
+
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(run())
+        finally:
+            loop.close()
+
+    def test_headers(self):
+        # the token is checked (and maybe renewed) once, outside of the event loop's thread
+        threads = []
+        self.headers.side_effect = lambda user: threads.append(threading.current_thread()) or {}
+
+        async def fetch(client):
+            return await aio.gather(client.get_step(step_id) for step_id in list(self.course.steps)[:5])
+
+        self._run(fetch)
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+
+    def test_get_course(self):
+        course = self._run(lambda client: client.get_course(self.course.id))
+        self.assertEqual(course['courses'][0]['title'], 'Fake course')
+
+    def test_load_entities(self):
+        # more than a page and more than a batch, in an order of their own, with a duplicate
+        ids = list(reversed(list(self.course.steps)))[:30]
+        ids.append(ids[0])
+        steps = self._run(lambda client: client.load_entities(ids, aio.STEPS, 'steps', batch_size=25))
+        self.assertEqual([step['id'] for step in steps], ids)
+        # a batch of 25 takes 2 pages, and a batch of 5 takes 1
+        self.assertEqual(self.server.requests['GET /api/steps'], 3)
+
+    def test_submit(self):
+        step = self.course.first_step_of_type('code')
+
+        async def submit(client):
+            attempt = await client.create_attempt(step['id'])
+            submission = {'submission': {'attempt': attempt['id'], 'reply': {'code': 'print(1)', 'language': 'python3'}}}
+            submission_id = await client.post_submission(submission)
+            return await client.get_submissions([submission_id])
+
+        submissions = self._run(submit)
+        self.assertEqual(submissions[0]['status'], 'correct')
+
+    def test_download_dataset(self):
+        with tempfile.TemporaryDirectory() as folder:
+            filename = os.path.join(folder, "dataset")
+            size = self._run(lambda client: client.download_dataset('/api/attempts/1/file', filename))
+            with open(filename, "rb") as file:
+                self.assertEqual(file.read(), self.server.dataset)
+        self.assertEqual(size, len(self.server.dataset))
@@ -0,0 +1,77 @@
+import os
+import json
+import datetime
+import tempfile
+import unittest
+from unittest import mock
+
+from stepik import attempt_cache
+from stepik.client.attempt import Attempt
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.attempt_file = os.path.join(folder.name, "attempt_file")
+        for name, value in (
+            ('STATE_DB', os.path.join(folder.name, "state.db")), ('ATTEMPT_FILE', self.attempt_file), ('_db', None)
+        ):
+            patcher = mock.patch.object(attempt_cache, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: attempt_cache._db and attempt_cache._db.close())
+
+    def _attempt(self, step_id, due_in):
+        now = datetime.datetime.now()
+        return Attempt(step_id * 10, now, now + datetime.timedelta(seconds=due_in), step_id, 'active')
+
+    def test_position(self):
+        attempt_cache.set_position(lesson_id='12', steps=[5, 6, 7], current_position=2)
+        self.assertEqual(attempt_cache.get_step_id(), 6)
+        attempt_cache.set_position(current_position=3)
+        self.assertEqual(attempt_cache.get_step_id(), 7)
+        self.assertEqual(attempt_cache.get_lesson_id(), '12')
+
+    def test_data_round_trip(self):
+        attempt_cache.set_attempt(self._attempt(5, 60))
+        data = attempt_cache.get_data()
+        data.update({'lesson_id': 3, 'steps': [5], 'current_position': 1})
+        attempt_cache.set_data(data)
+        data = attempt_cache.get_data()
+        self.assertEqual(attempt_cache.get_current_position(data), 1)
+        self.assertEqual(attempt_cache.get_attempt(5, data).id, 50)
+        self.assertEqual(attempt_cache.get_attempt(5).id, 50)
+
+    def test_missing_attempt(self):
+        self.assertRaises(KeyError, attempt_cache.get_attempt, 5)
+
+    def test_clear(self):
+        attempt_cache.set_position(lesson_id=1, steps=[5], current_position=1)
+        attempt_cache.clear()
+        self.assertEqual(attempt_cache.get_data(), {'attempts': {}})
+
+    def test_migrate_and_prune(self):
+        with open(self.attempt_file, "w") as file:
+            json.dump({
+                'lesson_id': 4, 'steps': [8, 9], 'current_position': 2,
+                'attempts': {'8': self._attempt(8, 60).json(), '9': self._attempt(9, -10 ** 6).json()}
+            }, file)
+        data = attempt_cache.get_data()
+        self.assertEqual(attempt_cache.get_step_id(data), 9)
+        self.assertEqual(list(data['attempts']), ['8'])
+        self.assertFalse(os.path.exists(self.attempt_file))
+
+    def test_prune_on_write(self):
+        attempt_cache.set_attempt(self._attempt(8, 60))
+        attempt_cache._query("UPDATE attempts SET due = ?", (str(datetime.datetime.now() - datetime.timedelta(days=30)),))
+        attempt_cache._db.close()
+        attempt_cache._db = None
+        # connecting and reading don't write anything
+        with mock.patch.object(attempt_cache, '_Transaction', side_effect=AssertionError("wrote")):
+            self.assertEqual(list(attempt_cache.get_data()['attempts']), ['8'])
+        attempt_cache.set_attempt(self._attempt(9, 60))
+        self.assertEqual(list(attempt_cache.get_data()['attempts']), ['9'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+from stepik.client import batch, stepikclient
+from stepik.utils import ExitError, exit_util, raise_errors
+from helpers import FakeResponse
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+
+    def _manifest(self, contents):
+        path = os.path.join(self.folder, "manifest.json")
+        with open(path, "w") as file:
+            file.write(contents if isinstance(contents, str) else json.dumps(contents))
+        return path
+
+    def _read(self, contents, steps=(301, 302, 303)):
+        lesson = {'lessons': [{'id': 9172, 'steps': list(steps)}]}
+        with mock.patch.object(stepikclient, 'get_lesson', return_value=lesson) as get_lesson, raise_errors():
+            entries = batch.read_manifest(None, self._manifest(contents))
+        self.lessons = [call[0][1] for call in get_lesson.call_args_list]
+        return entries
+
+    def test_manifest_step_ids(self):
+        entries = self._read({'language': 'python3', 'submissions': [
+            {'file': 'a.py', 'step': 2}, {'file': 'b.cpp', 'step': '5', 'language': 'c++11'}
+        ]})
+        self.assertEqual(entries, [
+            {'file': 'a.py', 'step': 2, 'language': 'python3'}, {'file': 'b.cpp', 'step': 5, 'language': 'c++11'}
+        ])
+        self.assertEqual(self.lessons, [])
+
+    def test_manifest_lesson_positions(self):
+        entries = self._read({'lesson': 9172, 'submissions': [{'file': 'a.txt', 'step': 3}, {'file': 'b.txt', 'step': 1}]})
+        self.assertEqual([entry['step'] for entry in entries], [303, 301])
+        self.assertEqual([entry['language'] for entry in entries], [None, None])
+        self.assertEqual(self.lessons, [9172])
+
+    def test_manifest_position_out_of_range(self):
+        for position in (0, 4):
+            with self.assertRaises(ExitError) as error:
+                self._read({'lesson': 9172, 'submissions': [{'file': 'a.py', 'step': position}]})
+            self.assertIn("doesn't have a step {}".format(position), str(error.exception))
+
+    def test_manifest_errors(self):
+        with self.assertRaises(ExitError) as error:
+            self._read("{not json")
+        self.assertIn("not valid JSON", str(error.exception))
+        with self.assertRaises(ExitError) as error, raise_errors():
+            batch.read_manifest(None, os.path.join(self.folder, "missing.json"))
+        self.assertIn("not found", str(error.exception))
+
+    def _submit(self, entries, statuses, deadline=None):
+        """
+        submit the entries, failing to prepare the ones whose file is "missing" or "broken"
+        statuses: the status of each submission id on each poll
+        """
+        submission_ids = iter(range(1, len(entries) + 1))
+
+        def prepare_submission(user, filename, language, step_id):
+            if filename == "missing":
+                exit_util("File {} not found".format(filename))
+            if filename == "broken":
+                raise KeyError("reply")
+            return {'submission': {'attempt': step_id * 10}}
+
+        def get_submissions(user, ids):
+            poll = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+            return FakeResponse(200, {'submissions': [
+                {'id': submission_id, 'status': poll[submission_id], 'hint': 'hint {}'.format(submission_id)}
+                for submission_id in ids
+            ]})
+
+        with mock.patch.multiple(
+            stepikclient, prepare_submission=prepare_submission, get_submissions=get_submissions,
+            send_submission=lambda user, submission: (next(submission_ids), 0)
+        ):
+            original = stepikclient.create_poller
+            with mock.patch.object(
+                stepikclient, 'create_poller', lambda user: original(user, interval=0, jitter=0)
+            ):
+                return batch.submit_batch(None, entries, workers=2, deadline=deadline)
+
+    def test_submit_batch(self):
+        entries = [{'file': name, 'step': step, 'language': 'python3'} for name, step in (('a.py', 1), ('b.py', 2))]
+        results = self._submit(entries, [{1: 'evaluation', 2: 'wrong'}, {1: 'correct'}])
+        self.assertEqual([entry['attempt'] for entry in results], [10, 20])
+        self.assertEqual([entry['status'] for entry in results], ['correct', 'wrong'])
+        self.assertEqual([entry['message'] for entry in results], ['hint 1', 'hint 2'])
+        self.assertTrue(all(entry['seconds'] is not None for entry in results))
+
+    def test_row_failures(self):
+        # a row that fails doesn't keep the rest from being submitted
+        entries = [{'file': name, 'step': 1, 'language': None} for name in ('missing', 'a.py', 'broken')]
+        results = self._submit(entries, [{1: 'correct'}])
+        self.assertEqual([entry['status'] for entry in results], ['error', 'correct', 'error'])
+        self.assertEqual(results[0]['message'], "File missing not found")
+        self.assertIn("KeyError", results[2]['message'])
+        self.assertEqual([entry['submission'] for entry in results], [None, 1, None])
+
+    def test_timeout(self):
+        entries = [{'file': name, 'step': 1, 'language': None} for name in ('a.py', 'b.py')]
+        results = self._submit(entries, [{1: 'correct', 2: 'evaluation'}], deadline=0)
+        self.assertEqual([entry['status'] for entry in results], ['correct', 'timeout'])
+        self.assertIsNone(results[1]['seconds'])
+
+    def test_format_results(self):
+        entries = [
+            {'file': 'a.py', 'step': 1, 'attempt': 10, 'submission': 1, 'status': 'wrong', 'seconds': 1.5,
+             'message': 'Failed test\t#2\n'},
+            {'file': 'b.py', 'step': 2, 'attempt': None, 'submission': None, 'status': 'error', 'seconds': None,
+             'message': 'File b.py not found'},
+        ]
+        table = batch.format_results(entries).split("\n")
+        self.assertEqual(table[0], "\t".join(batch.FIELDS))
+        self.assertEqual(table[1], "a.py\t1\t10\t1\twrong\t1.5\tFailed test #2 ")
+        self.assertEqual(table[2], "b.py\t2\t\t\terror\t\tFile b.py not found")
+        rows = json.loads(batch.format_results(entries, as_json=True))
+        self.assertEqual(rows[1], dict(entries[1]))
+        self.assertEqual(list(rows[0]), list(batch.FIELDS))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+End-to-end benchmarks of the CLI against a local fake of the Stepik API (see fake_stepik.py)
+Every scenario runs the real commands in subprocesses, and is measured by its wall time and by the number of
+requests that reached the server. The request budgets catch regressions in caching and batching.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import datetime
+import tempfile
+import subprocess
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_stepik import FakeCourse, FakeStepik
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the most requests (to the fake server) that each scenario may use
+REQUEST_BUDGET = {
+    'course (cold)': 40,
+    'course (warm)': 2,
+    'course (recache)': 40,
+    'navigate 5 code steps': 12,
+    'navigate back 5 code steps': 12,
+    'dataset': 4,
+    'submit': 6,
+    'sync (cold)': 40,
+    'sync (warm)': 12,
+    'text (offline)': 0,
+}
+# the most seconds that each scenario may take (these are loose, to tolerate slow machines)
+TIME_BUDGET = {
+    'course (cold)': 10,
+    'course (warm)': 5,
+    'course (recache)': 10,
+    'navigate 5 code steps': 10,
+    'navigate back 5 code steps': 10,
+    'dataset': 5,
+    'submit': 10,
+    'sync (cold)': 10,
+    'sync (warm)': 10,
+    'text (offline)': 5,
+}
+
+
+class Test(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.course = FakeCourse(sections=10, lessons=10, steps=5)
+        cls.server = FakeStepik(cls.course, latency=0.005, evaluation_polls=2).start()
+        cls.folder = tempfile.mkdtemp()
+        cls.app_folder = os.path.join(cls.folder, '.stepik')
+        os.mkdir(cls.app_folder)
+        # a token that won't expire during the benchmarks, so that no command needs to authenticate
+        with open(os.path.join(cls.app_folder, 'client_file'), 'w') as client_file:
+            json.dump({
+                'client_id': 'id', 'client_secret': 'secret', 'access_token': 'token',
+                'expiration': (datetime.datetime.now() + datetime.timedelta(days=1)).isoformat()
+            }, client_file)
+        cls.results = []
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        shutil.rmtree(cls.folder)
+        if cls.results:
+            print("\n{:<28}{:>10}{:>10}".format('scenario', 'requests', 'seconds'), file=sys.stderr)
+            for name, requests, seconds in cls.results:
+                print("{:<28}{:>10}{:>10.3f}".format(name, requests, seconds), file=sys.stderr)
+
+    def stepik(self, *args):
+        env = dict(os.environ, PYTHONPATH=ROOT, STEPIK_HOST=self.server.host, STEPIK_APP_FOLDER=self.app_folder)
+        result = subprocess.run(
+            [sys.executable, '-m', 'stepik'] + [str(arg) for arg in args],
+            cwd=self.folder, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+        self.assertEqual(result.returncode, 0, result.stderr.decode())
+        return result.stdout.decode() + result.stderr.decode()
+
+    def measure(self, name, *commands):
+        """run the commands, one after another, and check them against the budgets of the scenario"""
+        self.server.reset_counts()
+        start = time.perf_counter()
+        for command in commands:
+            self.stepik(*command)
+        seconds = time.perf_counter() - start
+        requests = self.server.total_requests()
+        self.results.append((name, requests, seconds))
+        self.assertLessEqual(requests, REQUEST_BUDGET[name], dict(self.server.requests))
+        self.assertLess(seconds, TIME_BUDGET[name])
+
+    def step_link(self, step_id):
+        step = self.course.steps[step_id]
+        return "{}lesson/{}/step/{}".format(self.server.host, step['lesson'], step['position'])
+
+    def test_course(self):
+        self.measure('course (cold)', ('course', self.course.id, '--recache'))
+        self.measure('course (warm)', ('course', self.course.id))
+        # recaching shouldn't trust the cached course, since its sections might have changed
+        self.measure('course (recache)', ('course', self.course.id, '--recache'))
+        self.assertEqual(self.server.requests['GET /api/courses/<id>'], 1)
+
+    def test_navigate(self):
+        self.stepik('course', self.course.id)
+        self.stepik('step', self.step_link(min(self.course.steps)))
+        self.stepik('type', 'code')
+        self.measure('navigate 5 code steps', *[('next',)] * 5)
+        self.measure('navigate back 5 code steps', *[('prev',)] * 5)
+        self.stepik('type', 'all')
+
+    def test_dataset(self):
+        step = self.course.first_step_of_type('dataset')
+        self.stepik('step', self.step_link(step['id']))
+        self.measure('dataset', ('dataset', 'dataset.txt'))
+        with open(os.path.join(self.folder, 'dataset.txt'), 'rb') as dataset:
+            self.assertEqual(dataset.read(), self.server.dataset)
+
+    def test_submit(self):
+        step = self.course.first_step_of_type('code')
+        self.stepik('step', self.step_link(step['id']))
+        with open(os.path.join(self.folder, 'solution.py'), 'w') as solution:
+            solution.write("print(input())\n")
+        self.measure('submit', ('submit', 'solution.py', '-l', 'python3'))
+
+    def test_sync(self):
+        # the other scenarios shouldn't be able to use the mirror
+        self.addCleanup(shutil.rmtree, os.path.join(self.app_folder, 'mirror'), True)
+        self.measure('sync (cold)', ('sync', self.course.id))
+        self.measure('sync (warm)', ('sync', self.course.id))
+        step = self.course.first_step_of_type('text')
+        self.stepik('step', self.step_link(step['id']))
+        self.measure('text (offline)', ('text',))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from stepik import course_cache
+from stepik.course_cache import CourseCache
+from helpers import course_cache as _course_cache, fake_course
+
+
+class Test(unittest.TestCase):
+    def test_next_lesson(self):
+        cache = _course_cache([1, 2, 3])
+        self.assertEqual(cache.get_next_lesson(1, 1), (2, 1))
+        self.assertEqual(cache.get_next_lesson(3, -1), (2, 1))
+
+    def test_next_lesson_at_ends(self):
+        cache = _course_cache([1, 2, 3])
+        self.assertRaises(ValueError, cache.get_next_lesson, 3, 1)
+        self.assertRaises(ValueError, cache.get_next_lesson, 1, -1)
+        self.assertRaises(ValueError, cache.get_next_lesson, 4, 1)
+
+    def test_next_lesson_duplicates(self):
+        cache = _course_cache([7, 1, 7, 2, 7])
+        self.assertEqual(cache.get_next_lesson(7, 1), (1, 1))
+        self.assertEqual(cache.get_next_lesson(7, 1, 2), (2, 3))
+        self.assertEqual(cache.get_next_lesson(7, -1), (2, 3))
+        self.assertEqual(cache.get_next_lesson(7, -1, 2), (1, 1))
+        self.assertRaises(ValueError, cache.get_next_lesson, 7, -1, 0)
+
+    def test_index_is_persisted(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = Path(folder) / "course_cache_file"
+            _course_cache([5, 6, 5], path=path).save()
+            cache = CourseCache(cache_path=path)
+            self.assertTrue(cache.load(None))
+            self.assertEqual(cache.data['index'], {'5': [0, 2], '6': [1]})
+
+    def test_shards(self):
+        with tempfile.TemporaryDirectory() as folder:
+            first, second = _course_cache([1, 2], path=folder), _course_cache([3], path=folder)
+            second.course.id = 2
+            first.save()
+            second.save()
+            self.assertEqual(sorted(os.listdir(folder)), ['1.json', '1.lessons', '2.json', '2.lessons', 'current'])
+            self.assertEqual(os.path.getsize(os.path.join(folder, '1.lessons')), 2 * first.data['lessons'].itemsize)
+            cache = CourseCache(cache_path=folder)
+            self.assertTrue(cache.load(None))
+            self.assertEqual((cache.course.id, list(cache.data['lessons'])), (2, [3]))
+            cache = CourseCache(fake_course(), folder)
+            self.assertTrue(cache.load(None))
+            self.assertEqual(list(cache.data['lessons']), [1, 2])
+            self.assertEqual(CourseCache(cache_path=folder)._read_current(), 1)
+
+    def test_migrate(self):
+        with tempfile.TemporaryDirectory() as folder:
+            old_file, new_folder = os.path.join(folder, "course_cache_file"), os.path.join(folder, "course_cache")
+            with open(old_file, "w") as file:
+                json.dump({'current': 7, 'courses': {
+                    '7': {'course': [7, 'A'], 'lessons': [4, 5]}, '8': {'course': [8, 'B'], 'lessons': [6]}
+                }}, file)
+            with mock.patch.object(course_cache, 'COURSE_CACHE_FILE', old_file), \
+                    mock.patch.object(course_cache, 'COURSE_CACHE_FOLDER', new_folder):
+                cache = CourseCache(cache_path=new_folder)
+                self.assertTrue(cache.load(None))
+            self.assertEqual((cache.course.id, list(cache.data['lessons'])), (7, [4, 5]))
+            self.assertEqual(cache.data['index'], {'4': [0], '5': [1]})
+            self.assertTrue(os.path.exists(os.path.join(new_folder, "8.lessons")))
+            self.assertFalse(os.path.exists(old_file))
+
+    def test_write_per_process(self):
+        # processes that save at the same time each write their own temporary file
+        with tempfile.TemporaryDirectory() as folder:
+            cache = CourseCache(fake_course(), cache_path=folder)
+            replaced = []
+            with mock.patch.object(course_cache.os, 'getpid', return_value=123), \
+                    mock.patch.object(course_cache.os, 'replace', side_effect=lambda src, dst: replaced.append(src)):
+                cache._write(Path(folder) / "current", lambda file: file.write(b"7"))
+            self.assertEqual(replaced, [os.path.join(folder, "current.123.tmp")])
+
+    def test_constant_time_hops(self):
+        """a hop at the end of a 10k lesson course reads as few lessons as a hop at the start"""
+        lessons = _CountingList(range(10000))
+        cache = _course_cache(lessons)
+
+        def reads(lesson_id, direction):
+            lessons.reads = 0
+            cache.get_next_lesson(lesson_id, direction, lesson_id)
+            return lessons.reads
+
+        self.assertEqual(reads(9998, 1), reads(0, 1))
+        self.assertEqual(reads(1, -1), reads(9999, -1))
+        self.assertLessEqual(reads(9998, 1), 1)
+
+
+class _CountingList(list):
+    """a list that counts how many of its items are read"""
+    reads = 0
+
+    def __getitem__(self, index):
+        self.reads += 1
+        return super().__getitem__(index)
+
+    def __iter__(self):
+        for item in super().__iter__():
+            self.reads += 1
+            yield item
+
+    def __contains__(self, value):
+        return any(item == value for item in self)
+
+    def index(self, value, *args):
+        position = super().index(value, *args)
+        self.reads += position + 1
+        return position
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import io
+import os
+import sys
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import click
+
+from stepik import daemon
+
+
+@click.group()
+@click.option("--loud", is_flag=True)
+def main(loud=False):
+    pass
+
+
+# the names passed to "greet"
+greeted = []
+
+
+@main.command()
+@click.argument("name")
+def greet(name):
+    greeted.append(name)
+    click.echo("hello " + name)
+    click.echo("to stderr", err=True)
+
+
+@main.command()
+@click.option("--greeting", envvar="STEPIK_GREETING", default="hello")
+def env(greeting):
+    click.echo(greeting)
+
+
+# set to let the "slow" command finish
+release = threading.Event()
+
+
+@main.command()
+def slow():
+    release.wait(5)
+
+
+@main.command()
+def fail():
+    sys.exit(3)
+
+
+@main.command()
+def auth():
+    click.echo("authenticated")
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder)
+        self.socket_path = os.path.join(self.folder, "daemon.sock")
+
+    def _serve(self):
+        thread = threading.Thread(target=daemon.serve, args=(main, self.socket_path), daemon=True)
+        patcher = mock.patch.object(daemon, 'serving', False)
+        patcher.start()
+        thread.start()
+        for _ in range(100):
+            if os.path.exists(self.socket_path):
+                break
+            threading.Event().wait(0.01)
+
+        def stop():
+            daemon.stop(self.socket_path)
+            thread.join(5)
+            patcher.stop()
+        self.addCleanup(stop)
+
+    def _forward(self, *args):
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with mock.patch.object(sys, 'stdout', stdout), mock.patch.object(sys, 'stderr', stderr):
+            exit_code = daemon.forward(main, list(args), self.socket_path)
+        return exit_code, stdout.getvalue(), stderr.getvalue()
+
+    def test_command_name(self):
+        self.assertEqual(daemon.command_name(main, ['--loud', 'greet', 'you']), 'greet')
+        self.assertEqual(daemon.command_name(main, ['auth']), 'auth')
+        self.assertIsNone(daemon.command_name(main, ['--loud']))
+        self.assertIsNone(daemon.command_name(main, []))
+
+    def test_forward(self):
+        self._serve()
+        self.assertEqual(self._forward('--loud', 'greet', 'you'), (0, "hello you\n", "to stderr\n"))
+        self.assertEqual(self._forward('fail')[0], 3)
+
+    def test_local_commands(self):
+        self._serve()
+        # options before the command shouldn't hide that it must run locally
+        self.assertIsNone(self._forward('--loud', 'auth')[0])
+        self.assertIsNone(self._forward('auth')[0])
+        self.assertIsNone(self._forward('greet', '-')[0])
+
+    def test_not_running(self):
+        self.assertIsNone(self._forward('greet', 'you')[0])
+        self.assertFalse(daemon.stop(self.socket_path))
+
+    def _request(self, request):
+        """send a request to the daemon. return the messages it answers with"""
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        with connection:
+            connection.connect(self.socket_path)
+            daemon._send(connection, request)
+            return list(daemon._messages(connection))
+
+    def test_startup_environment(self):
+        # the daemon can't run commands for a client that uses another server
+        self._serve()
+        request = {
+            'args': ['greet', 'you'], 'cwd': self.folder, 'color': False, 'env': {'STEPIK_HOST': 'http://other/'}
+        }
+        self.assertEqual(self._request(request), [{'ready': True}, {'local': True}])
+
+    def test_busy(self):
+        # while the daemon runs a long command, other commands don't wait for it
+        self._serve()
+        release.clear()
+        self.addCleanup(release.set)
+        results = []
+        thread = threading.Thread(target=lambda: results.append(daemon.forward(main, ['slow'], self.socket_path)))
+        thread.start()
+        threading.Event().wait(0.2)
+        self.assertIsNone(daemon.forward(main, ['greet', 'late'], self.socket_path, timeout=0.1))
+        release.set()
+        thread.join(5)
+        self.assertEqual(results, [0])
+        # the command that gave up isn't run by the daemon later on
+        self.assertEqual(self._forward('greet', 'you'), (0, "hello you\n", "to stderr\n"))
+        self.assertNotIn('late', greeted)
+
+    def _run(self, request):
+        """run a request with daemon._run. return its exit code and its output on each stream"""
+        server, client = socket.socketpair()
+        with server, client:
+            exit_code = daemon._run(main, request, server)
+            server.shutdown(socket.SHUT_WR)
+            messages = list(daemon._messages(client))
+        output = {'stdout': '', 'stderr': ''}
+        for message in messages:
+            output[message['stream']] += message['data']
+        return exit_code, output
+
+    def test_run_environment(self):
+        # options read the client's environment, and the daemon's is restored afterwards
+        with mock.patch.dict(os.environ, {'STEPIK_GREETING': 'daemon', 'STEPIK_OTHER': '1'}):
+            request = {'args': ['env'], 'cwd': self.folder, 'color': False, 'env': {'STEPIK_GREETING': 'client'}}
+            self.assertEqual(self._run(request), (0, {'stdout': "client\n", 'stderr': ''}))
+            self.assertEqual(self._run(dict(request, env={})), (0, {'stdout': "hello\n", 'stderr': ''}))
+            self.assertEqual((os.environ['STEPIK_GREETING'], os.environ['STEPIK_OTHER']), ('daemon', '1'))
+
+    def test_run(self):
+        request = {'args': ['greet', 'you'], 'cwd': self.folder, 'color': False}
+        self.assertEqual(self._run(request), (0, {'stdout': "hello you\n", 'stderr': "to stderr\n"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
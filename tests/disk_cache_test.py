@@ -0,0 +1,59 @@
+import os
+import time
+import tempfile
+import unittest
+from unittest import mock
+
+from stepik.disk_cache import DiskCache
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.cache = DiskCache(self.folder.name, 10 ** 6)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_get_missing(self):
+        self.assertEqual(self.cache.get('missing'), None)
+
+    def test_put_get(self):
+        self.cache.put('key', {'a': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'a': [1, 2]})
+
+    def test_evict_least_recently_used(self):
+        for key in ('old', 'use', 'new'):
+            self.cache.put(key, 'x' * 100)
+        # backdate the entries so that their order doesn't depend on the clock's resolution
+        for age, key in enumerate(('new', 'use', 'old')):
+            path = str(self.cache._path(key))
+            os.utime(path, (time.time() - 100 * (age + 1),) * 2)
+        self.cache.get('use')
+        self.cache.max_bytes = 2 * os.path.getsize(str(self.cache._path('new')))
+        self.cache.evict()
+        self.assertEqual(self.cache.get('old'), None)
+        self.assertNotEqual(self.cache.get('use'), None)
+        self.assertNotEqual(self.cache.get('new'), None)
+
+    def test_put_scans_once(self):
+        with mock.patch.object(self.cache, '_entries', wraps=self.cache._entries) as entries:
+            for index in range(20):
+                self.cache.put(str(index), 'x' * 100)
+            self.cache.put('0', 'y' * 100)
+        self.assertEqual(entries.call_count, 1)
+        self.assertEqual(self.cache._size, sum(entry.stat().st_size for entry in os.scandir(self.folder.name)))
+
+    def test_put_evicts_over_budget(self):
+        self.cache.put('first', 'x' * 100)
+        self.cache.max_bytes = os.path.getsize(str(self.cache._path('first'))) + 10
+        self.cache.put('second', 'x' * 100)
+        self.assertEqual(len(os.listdir(self.folder.name)), 1)
+
+    def test_clear(self):
+        self.cache.put('key', 1)
+        self.assertEqual(self.cache.clear(), 1)
+        self.assertEqual(self.cache.get('key'), None)
+
+if __name__ == "__main__":
+    unittest.main()
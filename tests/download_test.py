@@ -0,0 +1,117 @@
+import os
+import gzip
+import zlib
+import tempfile
+import unittest
+from unittest import mock
+
+from stepik.client import stepikclient
+from stepik.client.stepikclient import decompressed, download_file
+from helpers import FakeResponse
+
+DATA = b"".join(b"line %d\n" % i for i in range(1000))
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.filename = os.path.join(folder.name, "dataset")
+        self.part_name = self.filename + ".part"
+        patcher = mock.patch.object(stepikclient, 'get_headers', return_value={})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _download(self, responses, decompress=False, head=None):
+        """download with get_request answering with these responses. return the Range header of each request"""
+        ranges = []
+
+        def get_request(url, headers, **kwargs):
+            ranges.append(headers.get('Range'))
+            return responses.pop(0)
+
+        with mock.patch.object(stepikclient, 'get_request', get_request), \
+                mock.patch.object(stepikclient, 'request', return_value=head) as request:
+            download_file(None, "https://stepik.org/dataset", self.filename, decompress=decompress)
+        self.heads = request.call_count
+        return ranges
+
+    def _read(self, name=None):
+        with open(name or self.filename, "rb") as file:
+            return file.read()
+
+    def _write_part(self, contents):
+        with open(self.part_name, "wb") as file:
+            file.write(contents)
+
+    def test_download(self):
+        ranges = self._download([FakeResponse(200, DATA, {'Content-Length': str(len(DATA))})])
+        self.assertEqual(ranges, [None])
+        self.assertEqual(self._read(), DATA)
+        self.assertFalse(os.path.exists(self.part_name))
+
+    def test_resume(self):
+        self._write_part(DATA[:100])
+        ranges = self._download([FakeResponse(206, DATA[100:])])
+        self.assertEqual(ranges, ['bytes=100-'])
+        self.assertEqual(self._read(), DATA)
+
+    def test_resume_ignored(self):
+        # the server sent the whole file instead of the rest of it
+        self._write_part(DATA[:100])
+        self._download([FakeResponse(200, DATA)])
+        self.assertEqual(self._read(), DATA)
+
+    def test_complete_part(self):
+        # a 416 for a Range that starts at the end of the file means that we already have all of it
+        self._write_part(DATA)
+        ranges = self._download([FakeResponse(416, headers={'Content-Range': 'bytes */{}'.format(len(DATA))})])
+        self.assertEqual(ranges, ['bytes={}-'.format(len(DATA))])
+        self.assertEqual(self._read(), DATA)
+        self.assertFalse(os.path.exists(self.part_name))
+        self.assertEqual(self.heads, 0)
+
+    def test_complete_part_head(self):
+        # without a Content-Range, the size comes from a HEAD request
+        self._write_part(DATA)
+        head = FakeResponse(200, headers={'Content-Length': str(len(DATA))})
+        self._download([FakeResponse(416)], head=head)
+        self.assertEqual(self._read(), DATA)
+        self.assertEqual(self.heads, 1)
+
+    def test_stale_part(self):
+        # the partial file is larger than the file on the server, so it's downloaded again
+        self._write_part(DATA + b"stale")
+        ranges = self._download([
+            FakeResponse(416, headers={'Content-Range': 'bytes */{}'.format(len(DATA))}), FakeResponse(200, DATA)
+        ])
+        self.assertEqual(ranges, ['bytes={}-'.format(len(DATA) + 5), None])
+        self.assertEqual(self._read(), DATA)
+
+    def test_decompress(self):
+        for compress in (gzip.compress, zlib.compress):
+            self._download([FakeResponse(200, compress(DATA))], decompress=True)
+            self.assertEqual(self._read(), DATA)
+
+    def test_decompress_plain(self):
+        # "x^" looks like a zlib header, but this isn't compressed
+        data = b"x^2 + y^2\n" * 1000
+        self._download([FakeResponse(200, data)], decompress=True)
+        self.assertEqual(self._read(), data)
+
+    def test_decompressed(self):
+        compressed = gzip.compress(DATA)
+        chunks = [compressed[start:start + 100] for start in range(0, len(compressed), 100)]
+        self.assertEqual(b"".join(decompressed(chunks)), DATA)
+        self.assertEqual(b"".join(decompressed([b"plain", b" text"])), b"plain text")
+        self.assertEqual(b"".join(decompressed([b"x^2", b" + 1"])), b"x^2 + 1")
+        self.assertEqual(b"".join(decompressed([])), b"")
+
+    def test_decompressed_truncated(self):
+        # the first bytes are passed through if they don't decompress
+        truncated = zlib.compress(DATA)[:-10]
+        self.assertEqual(b"".join(decompressed([truncated])), truncated)
+        # but it's too late for that once they're decompressed
+        truncated = zlib.compress(os.urandom(200 * 1024))[:-10]
+        with self.assertRaises(zlib.error):
+            b"".join(decompressed([truncated[:100 * 1024], truncated[100 * 1024:]]))
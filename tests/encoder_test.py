@@ -0,0 +1,36 @@
+import json
+import tempfile
+import unittest
+
+from stepik.client.encoder import FileContents, encode_submission
+from stepik.utils import ExitError, raise_errors
+
+CONTENTS = 'print("héllo")\n\tx = "\\\\"\n\0' * 5000
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.file = tempfile.NamedTemporaryFile("w", suffix=".py")
+        self.file.write(CONTENTS)
+        self.file.flush()
+
+    def tearDown(self):
+        self.file.close()
+
+    def _submission(self):
+        return {"submission": {"reply": {"code": FileContents(self.file.name), "language": "python3"}, "attempt": 1}}
+
+    def test_encode(self):
+        body, stats = encode_submission(self._submission())
+        data = body.read()
+        self.assertEqual(json.loads(data.decode('utf-8')), {
+            "submission": {"reply": {"code": CONTENTS, "language": "python3"}, "attempt": 1}
+        })
+        self.assertEqual(stats['bytes'], len(data))
+
+    def test_limit(self):
+        with raise_errors():
+            self.assertRaises(ExitError, encode_submission, self._submission(), 1000)
+
+if __name__ == "__main__":
+    unittest.main()
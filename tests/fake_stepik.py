@@ -0,0 +1,216 @@
+"""
+A local stand-in for the Stepik API, for benchmarks
+It serves one course with a configurable number of sections, lessons, and steps, and it can add latency to every response
+"""
+import json
+import time
+import threading
+import collections
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+PAGE_SIZE = 20
+
+
+class FakeCourse:
+    """
+    A course with `sections` sections of `lessons` lessons each, and `steps` steps per lesson
+    Every `dataset_every`-th lesson ends with a dataset step, every other lesson ends with a code step,
+    and the rest of the steps are text
+    """
+
+    def __init__(self, course_id=1, sections=10, lessons=10, steps=5, dataset_every=10):
+        self.id = course_id
+        self.sections, self.units, self.lessons, self.steps = {}, {}, {}, {}
+        for s in range(sections):
+            section_id = s + 1
+            unit_ids = []
+            for l in range(lessons):
+                number = s * lessons + l
+                lesson_id, unit_id = 1000 + number, 50000 + number
+                step_ids = [100000 + number * steps + p for p in range(steps)]
+                for position, step_id in enumerate(step_ids, 1):
+                    name = 'text'
+                    if position == steps:
+                        name = 'dataset' if number % dataset_every == dataset_every - 1 else 'code'
+                    self.steps[step_id] = {
+                        'id': step_id, 'lesson': lesson_id, 'position': position, 'update_date': '2020-01-01T00:00:00Z',
+                        'block': {
+                            'name': name, 'text': '<p>Step {} of lesson {}</p>'.format(position, lesson_id) * 50,
+                            'options': {'code_templates': {'python3': '', 'c++11': ''}} if name == 'code' else {}
+                        }
+                    }
+                self.lessons[lesson_id] = {
+                    'id': lesson_id, 'title': 'Lesson {}'.format(lesson_id), 'steps': step_ids,
+                    'update_date': '2020-01-01T00:00:00Z'
+                }
+                self.units[unit_id] = {'id': unit_id, 'section': section_id, 'lesson': lesson_id, 'position': l + 1}
+                unit_ids.append(unit_id)
+            self.sections[section_id] = {
+                'id': section_id, 'title': 'Section {}'.format(section_id), 'units': unit_ids,
+                'update_date': '2020-01-01T00:00:00Z'
+            }
+        self.course = {
+            'id': course_id, 'title': 'Fake course', 'description': '<p>A fake course</p>',
+            'sections': list(self.sections), 'update_date': '2020-01-01T00:00:00Z'
+        }
+
+    def first_step_of_type(self, name):
+        return next(step for step in self.steps.values() if step['block']['name'] == name)
+
+
+class FakeStepik(ThreadingHTTPServer):
+    """
+    Serves a FakeCourse on localhost, counting every request by its path
+    latency: seconds added to every response
+    evaluation_polls: the number of times a submission is reported as being evaluated before it is graded
+    """
+    daemon_threads = True
+
+    def __init__(self, course=None, latency=0.005, evaluation_polls=2, dataset_size=10 ** 6):
+        super().__init__(('127.0.0.1', 0), _Handler)
+        self.course = course or FakeCourse()
+        self.latency = latency
+        self.evaluation_polls = evaluation_polls
+        self.dataset = (b'0123456789abcdef\n' * (dataset_size // 17 + 1))[:dataset_size]
+        self.attempts = {}
+        self.submissions = {}
+        self.requests = collections.Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def host(self):
+        return "http://127.0.0.1:{}/".format(self.server_port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def count(self, path):
+        with self._lock:
+            self.requests[path] += 1
+
+    def reset_counts(self):
+        with self._lock:
+            self.requests.clear()
+
+    def total_requests(self):
+        with self._lock:
+            return sum(self.requests.values())
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b'', headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length)
+
+    def _route(self, method):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        self.server.count("{} /{}".format(method, "/".join(part if not part.isdigit() else '<id>' for part in parts)))
+        time.sleep(self.server.latency)
+        return parts, parse_qs(url.query)
+
+    def _entities(self, kind, parts, query):
+        store = {
+            'courses': {self.server.course.id: self.server.course.course},
+            'sections': self.server.course.sections, 'units': self.server.course.units,
+            'lessons': self.server.course.lessons, 'steps': self.server.course.steps,
+        }[kind]
+        if len(parts) > 2:
+            entity = store.get(int(parts[2]))
+            if entity is None:
+                return self._send(404, {'detail': 'Not found.'})
+            etag = '"{}-{}"'.format(kind, entity['id'])
+            if self.headers.get('If-None-Match') == etag:
+                return self._send(304, headers={'ETag': etag})
+            return self._send(200, {'meta': {'has_next': False}, kind: [entity]}, {'ETag': etag})
+        page = int(query.get('page', ['1'])[0])
+        if 'ids[]' in query:
+            matches = [store[int(i)] for i in query['ids[]'] if int(i) in store]
+        else:
+            matches = list(store.values())
+        if page > 1 and (page - 1) * PAGE_SIZE >= len(matches):
+            return self._send(404, {'detail': 'Invalid page.'})
+        return self._send(200, {
+            'meta': {'page': page, 'has_next': page * PAGE_SIZE < len(matches)},
+            kind: matches[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        })
+
+    def _attempt(self, step_id):
+        with self.server._lock:
+            attempt_id = len(self.server.attempts) + 1
+            attempt = {
+                'id': attempt_id, 'step': step_id, 'status': 'active', 'time_left': 300,
+                'dataset_url': '/api/attempts/{}/file'.format(attempt_id)
+            }
+            self.server.attempts[attempt_id] = attempt
+        return attempt
+
+    def _dataset(self):
+        data = self.server.dataset
+        byte_range = self.headers.get('Range')
+        if byte_range:
+            start = int(byte_range.split('=')[1].split('-')[0])
+            return self._send(206, data[start:], {'Content-Range': 'bytes {}-{}/{}'.format(start, len(data) - 1, len(data))})
+        return self._send(200, data)
+
+    def _submission(self, submission_id):
+        submission = self.server.submissions[submission_id]
+        submission['polls'] += 1
+        status = 'evaluation' if submission['polls'] <= self.server.evaluation_polls else 'correct'
+        return {'id': submission_id, 'status': status, 'hint': ''}
+
+    def do_GET(self):
+        parts, query = self._route('GET')
+        if len(parts) < 2 or parts[0] != 'api':
+            return self._send(404)
+        kind = parts[1]
+        if kind in ('courses', 'sections', 'units', 'lessons', 'steps'):
+            return self._entities(kind, parts, query)
+        if kind == 'attempts' and parts[-1] == 'file':
+            return self._dataset()
+        if kind == 'submissions':
+            ids = [int(i) for i in query.get('ids[]', [])] or [int(parts[2])]
+            with self.server._lock:
+                return self._send(200, {'meta': {'has_next': False}, 'submissions': [self._submission(i) for i in ids]})
+        return self._send(404)
+
+    def do_POST(self):
+        parts, query = self._route('POST')
+        body = self._body()
+        if parts[:1] == ['oauth2']:
+            return self._send(200, {'access_token': 'token', 'expires_in': 36000})
+        kind = parts[1] if len(parts) > 1 else None
+        if kind == 'attempts':
+            if len(parts) > 2:
+                return self._send(200, {'attempts': [self.server.attempts[int(parts[2])]]})
+            step_id = int(json.loads(body.decode('utf-8'))['attempt']['step'])
+            return self._send(201, {'attempts': [self._attempt(step_id)]})
+        if kind == 'submissions':
+            with self.server._lock:
+                submission_id = len(self.server.submissions) + 1
+                self.server.submissions[submission_id] = {'polls': 0}
+            return self._send(201, {'submissions': [{'id': submission_id, 'status': 'evaluation'}]})
+        return self._send(404)
@@ -0,0 +1,66 @@
+import time
+import threading
+import unittest
+from unittest import mock
+
+from stepik.client import hedging
+from helpers import FakeResponse
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        # don't read or write the latencies of real runs
+        patcher = mock.patch.multiple(
+            hedging, _loaded=True, stats=dict.fromkeys(hedging.stats, 0), _latencies=hedging.deque(maxlen=10)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _send(self, *delays):
+        """a send() whose n-th call takes delays[n] seconds"""
+        calls = []
+        lock = threading.Lock()
+
+        def send():
+            with lock:
+                index = len(calls)
+                response = FakeResponse(body=index)
+                calls.append(response)
+            time.sleep(delays[index])
+            return response
+        return send, calls
+
+    def test_fast_response(self):
+        send, calls = self._send(0)
+        with mock.patch.object(hedging, 'delay', return_value=0.2):
+            self.assertEqual(hedging.hedged(send).body, 0)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(hedging.stats['hedged'], 0)
+
+    def test_hedge_wins(self):
+        send, calls = self._send(0.5, 0)
+        with mock.patch.object(hedging, 'delay', return_value=0.05):
+            self.assertEqual(hedging.hedged(send).body, 1)
+        self.assertEqual((hedging.stats['requests'], hedging.stats['hedged'], hedging.stats['wins']), (1, 1, 1))
+        time.sleep(0.6)
+        # the slow response was thrown away once it arrived, and the time it would have taken was recorded
+        self.assertTrue(calls[0].closed)
+        self.assertGreater(hedging.stats['saved'], 0.3)
+
+    def test_primary_wins(self):
+        send, calls = self._send(0.1, 0.5)
+        with mock.patch.object(hedging, 'delay', return_value=0.05):
+            self.assertEqual(hedging.hedged(send).body, 0)
+        self.assertEqual((hedging.stats['hedged'], hedging.stats['wins']), (1, 0))
+
+    def test_delay(self):
+        with mock.patch.object(hedging, 'HEDGE_MIN_SAMPLES', 10):
+            self.assertEqual(hedging.delay(), hedging.HEDGE_DELAY)
+            hedging._latencies.extend([0.1] * 9 + [2])
+            self.assertEqual(hedging.delay(), 2)
+            hedging._latencies.extend([0.1] * 10)
+            self.assertEqual(hedging.delay(), max(0.1, hedging.HEDGE_MIN_DELAY))
+
+
+if __name__ == "__main__":
+    unittest.main()
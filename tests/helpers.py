@@ -0,0 +1,46 @@
+"""Fixtures shared by the tests"""
+import json
+
+from stepik.course_cache import CourseCache
+
+
+class FakeResponse:
+    """a stand-in for a requests.Response. body is its JSON (ex: a dict) or its raw bytes"""
+
+    def __init__(self, status_code=200, body=None, headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+        self.closed = False
+
+    @property
+    def content(self):
+        if self.body is None:
+            return b''
+        return self.body if isinstance(self.body, bytes) else json.dumps(self.body).encode('utf-8')
+
+    def json(self):
+        return self.body
+
+    def iter_content(self, chunk_size):
+        content = self.content
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+def fake_course(course_id=1):
+    """a stand-in for a Course, with just the fields that the course cache uses"""
+    return type('Course', (), {'id': course_id, 'title': ''})()
+
+
+def course_cache(lessons, steps=None, path="course_cache_file"):
+    """a course cache with these lessons (and optionally, the [id, type] of their steps), without the network"""
+    cache = CourseCache(fake_course(), path)
+    cache.data['lessons'] = lessons
+    cache.data['index'] = cache._index_lessons(lessons)
+    if steps is not None:
+        cache.data['steps'] = steps
+    return cache
@@ -0,0 +1,45 @@
+import shutil
+import tempfile
+import unittest
+
+from stepik.client import mirror
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self._folder, mirror.MIRROR_FOLDER = mirror.MIRROR_FOLDER, self.folder
+
+    def tearDown(self):
+        mirror.MIRROR_FOLDER = self._folder
+        mirror.enabled = True
+        shutil.rmtree(self.folder)
+
+    def test_store(self):
+        index = dict()
+        step = {'id': 5, 'update_date': '2020-01-01T00:00:00Z', 'block': {'text': 'hello'}}
+        self.assertTrue(mirror.store('steps', step, index))
+        self.assertFalse(mirror.store('steps', step, index))
+        self.assertEqual(mirror.lookup('steps', 5), step)
+        step = dict(step, update_date='2021-01-01T00:00:00Z')
+        self.assertTrue(mirror.store('steps', step, index))
+        mirror.save_index(index)
+        self.assertEqual(mirror.load_index(), index)
+
+    def test_stamp(self):
+        # entities without an update date are compared by their contents
+        self.assertEqual(mirror.stamp({'id': 1, 'lesson': 2}), mirror.stamp({'lesson': 2, 'id': 1}))
+        self.assertNotEqual(mirror.stamp({'id': 1, 'lesson': 2}), mirror.stamp({'id': 1, 'lesson': 3}))
+
+    def test_lookup(self):
+        index = dict()
+        mirror.store('units', {'id': 1}, index)
+        self.assertEqual(mirror.lookup_all('units', [1]), [{'id': 1}])
+        self.assertIsNone(mirror.lookup_all('units', [1, 2]))
+        self.assertIsNone(mirror.lookup('submissions', 1))
+        mirror.enabled = False
+        self.assertIsNone(mirror.lookup('units', 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import json
+import random
+import tracemalloc
+import unittest
+
+from stepik.models.lesson import Lesson
+from stepik.models.step import Step
+
+# the number of steps in the memory benchmark
+STEPS = 5000
+# the most memory that the steps may keep, compared to keeping their whole payloads
+MEMORY_RATIO = 0.6
+
+
+def _step_payload(step_id):
+    """a step like the ones that the Stepik API returns"""
+    return {
+        'id': step_id, 'lesson': step_id // 10, 'position': step_id % 10 + 1, 'status': 'ready',
+        'block': {
+            'name': random.choice(('text', 'code', 'dataset')),
+            'text': "<p>The text of step {}.</p>".format(step_id) * 10,
+            'video': None, 'animation': None, 'options': {}, 'subtitle_files': [], 'source': None,
+            'is_deprecated': False, 'subtitles': {}, 'tests_archive': None, 'feedback_correct': '',
+            'feedback_wrong': '',
+        },
+        'actions': {'submit': '#', 'edit_instructions': None}, 'progress': '77-{}'.format(step_id),
+        'subscriptions': ['31-77-{}'.format(step_id), '30-77-{}'.format(step_id)], 'instruction': None,
+        'session': None, 'instruction_type': None, 'viewed_by': 1000, 'passed_by': 500,
+        'correct_ratio': 0.5, 'worth': 1, 'is_solutions_unlocked': False, 'solutions_unlocked_attempts': 3,
+        'has_submissions_restrictions': False, 'max_submissions_count': 3, 'variation': 1,
+        'variations_count': 1, 'is_enabled': True, 'create_date': '2020-01-01T00:00:00Z',
+        'update_date': '2020-01-01T00:00:00Z', 'discussions_count': 0, 'discussion_proxy': None,
+        'discussion_threads': ['77-{}-default'.format(step_id)],
+    }
+
+
+def _retained(load):
+    """the number of bytes still allocated after load() returns, while its result is alive"""
+    # the payloads are decoded from JSON, like API responses, so that they don't share strings with each other
+    page = json.dumps([_step_payload(step_id) for step_id in range(STEPS)])
+    tracemalloc.start()
+    try:
+        result = load(json.loads(page))
+        retained = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return retained
+
+
+class Test(unittest.TestCase):
+    def test_fields(self):
+        payload = _step_payload(12)
+        step = Step(None, payload)
+        self.assertEqual((step.id, step.position, step.block_name), (12, 3, payload['block']['name']))
+        # the rest of the fields are decoded when they're used
+        self.assertEqual(step.block, payload['block'])
+        self.assertEqual(step.discussion_threads, ['77-12-default'])
+        self.assertRaises(AttributeError, getattr, step, 'missing')
+
+    def test_load_more_data(self):
+        lesson = Lesson(None, {'id': 1})
+        lesson._load_from_data({'id': 1, 'title': 'A lesson', 'steps': [1, 2], 'cover_url': 'cover.png'})
+        self.assertEqual(str(lesson), "1\tA lesson")
+        self.assertEqual(lesson.steps, [1, 2])
+        self.assertEqual(lesson.cover_url, 'cover.png')
+
+    def test_memory(self):
+        # steps used to keep every field of their payloads, like these dictionaries do
+        payloads = _retained(lambda steps: [dict(step) for step in steps])
+        steps = _retained(lambda steps: [Step(None, step) for step in steps])
+        self.assertLess(steps, payloads * MEMORY_RATIO, "{} bytes as payloads, {} bytes as Step objects".format(
+            payloads, steps
+        ))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from unittest import mock
+
+from stepik import navigation
+from helpers import course_cache
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.cache = course_cache([10, 20, 30], {
+            '10': [[100, 'text'], [101, 'code']],
+            '20': [[200, 'text'], [201, 'text']],
+            '30': [[300, 'text'], [301, 'dataset']],
+        })
+        patcher = mock.patch.object(navigation.attempt_cache, 'set_position')
+        self.set_position = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(navigation.Lesson, 'get', side_effect=AssertionError("used the network"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_next_filtered_across_lessons(self):
+        data = {'lesson_id': '10', 'current_position': 2, 'steps': [100, 101]}
+        self.assertTrue(navigation.navigate(None, 'dataset', navigation.FORWARD, data, self.cache))
+        self.assertEqual(data, {'lesson_id': 30, 'current_position': 2, 'steps': [300, 301]})
+        # only the position is written, not every attempt
+        self.set_position.assert_called_once_with(lesson_id=30, current_position=2, steps=[300, 301])
+
+    def test_prev_filtered_across_lessons(self):
+        data = {'lesson_id': 30, 'current_position': 2, 'steps': [300, 301]}
+        self.assertTrue(navigation.navigate(None, 'code', navigation.BACK, data, self.cache))
+        self.assertEqual(data, {'lesson_id': 10, 'current_position': 2, 'steps': [100, 101]})
+
+    def test_next_within_lesson(self):
+        data = {'lesson_id': 20, 'current_position': 1, 'steps': [200, 201]}
+        self.assertTrue(navigation.navigate(None, 'all', navigation.FORWARD, data, self.cache))
+        self.assertEqual(data['current_position'], 2)
+
+if __name__ == "__main__":
+    unittest.main()
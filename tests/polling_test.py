@@ -0,0 +1,48 @@
+import unittest
+
+from stepik.client.polling import Poller, retry_after
+from helpers import FakeResponse
+
+
+class Test(unittest.TestCase):
+    def _poller(self, responses, **kwargs):
+        requested = []
+
+        def fetch(ids):
+            requested.append(list(ids))
+            return responses.pop(0)
+
+        kwargs.setdefault('interval', 0)
+        return Poller(fetch, **kwargs), requested
+
+    def test_batch(self):
+        poller, requested = self._poller([
+            FakeResponse(200, {'submissions': [{'id': 1, 'status': 'correct'}, {'id': 2, 'status': 'evaluation'}]}),
+            FakeResponse(200, {'submissions': [{'id': 2, 'status': 'wrong'}]}),
+        ])
+        results = poller.wait([1, 2])
+        self.assertEqual({key: value['status'] for key, value in results.items()}, {1: 'correct', 2: 'wrong'})
+        self.assertEqual(requested, [[1, 2], [2]])
+        self.assertEqual(poller.stats['polls'], 2)
+        self.assertEqual(sorted(poller.stats['latency']), [1, 2])
+
+    def test_throttled(self):
+        poller, requested = self._poller([
+            FakeResponse(429, headers={'Retry-After': '0'}),
+            FakeResponse(200, {'submissions': [{'id': 1, 'status': 'correct'}]}),
+        ])
+        self.assertEqual(poller.wait([1])[1]['status'], 'correct')
+        self.assertEqual(poller.stats['throttled'], 1)
+
+    def test_deadline(self):
+        evaluating = FakeResponse(200, {'submissions': [{'id': 1, 'status': 'evaluation'}]})
+        poller, requested = self._poller([evaluating] * 3, deadline=0)
+        self.assertRaises(TimeoutError, poller.wait, [1])
+
+    def test_retry_after(self):
+        self.assertEqual(retry_after(FakeResponse(429, headers={'Retry-After': '3'}), 1), 3)
+        self.assertEqual(retry_after(FakeResponse(429), 1), 1)
+        self.assertEqual(retry_after(FakeResponse(429, headers={'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}), 1), 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+from unittest import mock
+
+from stepik import prefetch
+from helpers import course_cache
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.cache = course_cache([10, 20, 30], {
+            '10': [[100, 'text'], [101, 'code']],
+            '20': [[200, 'text'], [201, 'code']],
+            '30': [[300, 'code'], [301, 'dataset']],
+        })
+
+    def test_plan_filtered(self):
+        data = {'lesson_id': 10, 'current_position': 2, 'steps': [100, 101]}
+        self.assertEqual(prefetch.plan(data, 'code', 1, self.cache, 3), ([101, 201, 300], [20, 30]))
+        self.assertEqual(prefetch.plan(data, 'dataset', 1, self.cache, 1), ([101, 301], [30]))
+
+    def test_plan_backward(self):
+        data = {'lesson_id': 20, 'current_position': 1, 'steps': [200, 201]}
+        self.assertEqual(prefetch.plan(data, 'all', -1, self.cache, 2), ([200, 101, 100], [10]))
+
+    def test_plan_without_course(self):
+        data = {'lesson_id': 20, 'current_position': 2, 'steps': [200, 201]}
+        self.assertEqual(prefetch.plan(data, 'all', 1, None), ([201], []))
+
+    def test_warm_budget(self):
+        pages = []
+
+        def get_entities_with_ids(user, ids, page, url, mirrored=True):
+            pages.append(list(ids))
+            kind = url.split('/')[-2]
+            return {'meta': {'has_next': True}, kind: [{'id': entity_id} for entity_id in ids]}
+
+        with mock.patch.object(prefetch, '_is_cached', side_effect=lambda user, kind, url, entity_id: entity_id == 101), \
+                mock.patch.object(prefetch.stepikclient, 'get_entities_with_ids', get_entities_with_ids), \
+                mock.patch.object(prefetch.response_cache, 'store') as store:
+            self.assertEqual(prefetch.warm(None, [101, 201, 300], [20, 30], budget=2), 2)
+        # the cached step isn't fetched, and there is more than one page of steps, so the lessons aren't fetched
+        self.assertEqual(pages, [[201, 300], [201, 300]])
+        self.assertEqual(store.call_count, 4)
+
+    def test_failures_are_silent(self):
+        data = {'lesson_id': 10, 'current_position': 2, 'steps': [100, 101]}
+        fail = lambda *args: prefetch.stepikclient.exit_util("Something went wrong. A request returned 404")
+        with mock.patch.object(prefetch, 'warm', side_effect=fail), \
+                mock.patch.object(prefetch.stepikclient.click, 'secho') as secho:
+            prefetch.prefetch(None, data, 'all', 1, self.cache)
+        secho.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
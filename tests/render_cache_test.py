@@ -0,0 +1,76 @@
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from click.testing import CliRunner
+
+from stepik import __main__, render_cache
+from stepik.client import stepikclient
+from stepik.models.lesson import Lesson
+from stepik.disk_cache import DiskCache
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self._cache, render_cache._cache = render_cache._cache, DiskCache(self.folder, 10 ** 6)
+        self.rendered = []
+        self._html2text, render_cache._html2text = render_cache._html2text, self._render
+
+    def tearDown(self):
+        render_cache._cache = self._cache
+        render_cache._html2text = self._html2text
+        shutil.rmtree(self.folder)
+
+    def _render(self, html):
+        self.rendered.append(html)
+        return html.upper()
+
+    def test_render(self):
+        self.assertEqual(render_cache.render('step', 1, 'a'), 'A')
+        self.assertEqual(render_cache.render('step', 1, 'a'), 'A')
+        self.assertEqual(self.rendered, ['a'])
+        # the step changed, so it should be rendered again
+        self.assertEqual(render_cache.render('step', 1, 'b'), 'B')
+        self.assertEqual(self.rendered, ['a', 'b'])
+
+    def test_prerender(self):
+        render_cache.render('step', 1, 'a')
+        # a single missing step is rendered without a pool of processes
+        self.assertEqual(render_cache.prerender('step', [(1, 'a'), (2, 'b')]), 1)
+        self.assertEqual(render_cache.prerender('step', [(1, 'a'), (2, 'b')]), 0)
+        self.assertEqual(render_cache.render('step', 2, 'b'), 'B')
+        self.assertEqual(self.rendered, ['a', 'b'])
+
+    def test_prerender_pool(self):
+        # the pool renders with the real html2text, in other processes
+        render_cache._html2text = self._html2text
+        self.assertEqual(render_cache.prerender('step', [(1, '<p>a</p>'), (2, '<p>b</p>')]), 2)
+        render_cache._html2text = self._render
+        self.assertEqual(render_cache.render('step', 2, '<p>b</p>').strip(), 'b')
+        self.assertEqual(self.rendered, [])
+
+    def test_text_prerender(self):
+        # the current step is displayed before the rest of the lesson is rendered
+        prerendered = []
+
+        def prerender(kind, pages):
+            prerendered.append((list(self.rendered), [page_id for page_id, _ in pages]))
+
+        data = {'lesson_id': 7, 'steps': [1, 2, 3], 'current_position': 2}
+        with mock.patch.object(__main__, 'User'), \
+                mock.patch.object(__main__.attempt_cache, 'get_data', return_value=data), \
+                mock.patch.object(stepikclient, 'get_step', return_value={'steps': [{'block': {'text': 'two'}}]}), \
+                mock.patch.object(Lesson, 'items', lambda lesson: [
+                    SimpleNamespace(id=step_id, block={'text': str(step_id)}) for step_id in lesson.steps
+                ]), \
+                mock.patch.object(render_cache, 'prerender', prerender):
+            result = CliRunner().invoke(__main__.text, ['--prerender'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(result.output, 'TWO\n')
+        self.assertEqual(prerendered, [(['two'], [1, 3])])
+
+if __name__ == "__main__":
+    unittest.main()
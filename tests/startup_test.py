@@ -0,0 +1,37 @@
+import os
+import sys
+import json
+import subprocess
+import unittest
+
+# the number of seconds that importing the CLI may take
+STARTUP_BUDGET = 0.1
+# modules that local commands (like "current" and "type") shouldn't need
+HEAVY_MODULES = ('requests', 'html2text', 'stepik.client.stepikclient', 'stepik.models.course', 'stepik.navigation')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = """
+import sys, time, json
+start = time.perf_counter()
+import stepik.__main__
+print(json.dumps({'seconds': time.perf_counter() - start, 'modules': sorted(sys.modules)}))
+"""
+
+
+class Test(unittest.TestCase):
+    def _import_cli(self):
+        output = subprocess.check_output([sys.executable, "-c", SCRIPT], cwd=ROOT)
+        return json.loads(output)
+
+    def test_no_heavy_imports(self):
+        modules = self._import_cli()['modules']
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_startup_budget(self):
+        # take the best of a few runs, so that a busy machine doesn't fail the test
+        seconds = min(self._import_cli()['seconds'] for _ in range(3))
+        self.assertLess(seconds, STARTUP_BUDGET)
+
+if __name__ == "__main__":
+    unittest.main()
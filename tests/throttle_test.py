@@ -0,0 +1,118 @@
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+from stepik.client import stepikclient
+from stepik.client.throttle import Throttle
+from stepik.utils import ExitError, raise_errors
+from helpers import FakeResponse
+
+
+class Test(unittest.TestCase):
+    def test_aimd(self):
+        throttle = Throttle(min_concurrency=1, max_concurrency=8, rate=1000, burst=1000)
+        tickets = [throttle.acquire() for _ in range(4)]
+        # every response to the requests that were in flight says the server is overloaded, but it only counts once
+        for ticket in tickets:
+            throttle.release(ticket, overloaded=True)
+        self.assertEqual(throttle.limit, 4)
+        self.assertEqual(throttle.stats['throttled'], 4)
+        throttle.release(throttle.acquire(), overloaded=True)
+        self.assertEqual(throttle.limit, 2)
+        # successes increase the limit by about one per round of requests
+        for _ in range(2):
+            throttle.release(throttle.acquire())
+        self.assertGreater(throttle.limit, 2.8)
+        self.assertLess(throttle.limit, 3.1)
+
+    def test_pause(self):
+        throttle = Throttle(rate=1000, burst=1000)
+        throttle.release(throttle.acquire(), overloaded=True, pause=0.1)
+        start = time.monotonic()
+        throttle.release(throttle.acquire())
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_pause_is_capped(self):
+        # a huge Retry-After mustn't freeze every later request
+        throttle = Throttle(rate=1000, burst=1000, max_pause=0.1)
+        throttle.release(throttle.acquire(), overloaded=True, pause=3600)
+        start = time.monotonic()
+        throttle.release(throttle.acquire())
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_token_bucket(self):
+        throttle = Throttle(rate=50, burst=2)
+        start = time.monotonic()
+        for _ in range(5):
+            throttle.release(throttle.acquire())
+        # two requests are sent right away, and the other three wait for tokens
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+
+    def test_unknown_outcome(self):
+        throttle = Throttle(min_concurrency=1, max_concurrency=8, rate=1000, burst=1000)
+        throttle.release(throttle.acquire(), overloaded=None)
+        self.assertEqual(throttle.limit, 8)
+        self.assertEqual(throttle.stats['throttled'], 0)
+
+    def _request(self, responses, request_type="get", max_pause=None, **kwargs):
+        session = mock.Mock()
+        session.request.side_effect = responses
+        self.throttle = Throttle(min_concurrency=1, max_concurrency=8, rate=1000, burst=1000)
+        if max_pause is not None:
+            self.throttle.max_pause = max_pause
+        with mock.patch.object(stepikclient, 'get_session', return_value=session), \
+                mock.patch.object(stepikclient, 'throttle', self.throttle), \
+                mock.patch.object(stepikclient.time, 'sleep') as sleep:
+            resp = stepikclient.request(request_type, "https://stepik.org/api/steps/1", **kwargs)
+        return resp, session.request.call_count, [call[0][0] for call in sleep.call_args_list]
+
+    def test_retry_get(self):
+        resp, sent, sleeps = self._request([
+            FakeResponse(503), requests.ConnectionError("reset"), FakeResponse(429, headers={'Retry-After': '2'}),
+            FakeResponse(200)
+        ])
+        self.assertEqual((resp.status_code, sent), (200, 4))
+        self.assertEqual(len(sleeps), 3)
+        self.assertEqual(sleeps[2], 2)
+
+    def test_retry_after_is_capped(self):
+        self.assertEqual(Throttle().max_pause, stepikclient.RETRY_MAX_WAIT)
+        start = time.monotonic()
+        resp, sent, sleeps = self._request(
+            [FakeResponse(503, headers={'Retry-After': '3600'}), FakeResponse(200)], max_pause=0.05
+        )
+        self.assertEqual((resp.status_code, sent), (200, 2))
+        self.assertEqual(sleeps, [stepikclient.RETRY_MAX_WAIT])
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_errors_release(self):
+        # a connection error or a timeout counts as the server being overloaded, and every request is released
+        resp, sent, _ = self._request([requests.Timeout("slow"), FakeResponse(200)])
+        self.assertEqual((resp.status_code, sent), (200, 2))
+        self.assertEqual(self.throttle._in_flight, 0)
+        self.assertEqual(self.throttle.stats['throttled'], 1)
+        self.assertLess(self.throttle.limit, 8)
+
+    def test_no_retry_invalid_request(self):
+        with raise_errors(), self.assertRaises(ExitError):
+            self._request([requests.exceptions.InvalidURL("bad url"), FakeResponse(200)])
+        self.assertEqual(self.throttle._in_flight, 0)
+        self.assertEqual(self.throttle.limit, 8)
+
+    def test_no_retry_post(self):
+        with raise_errors(), self.assertRaises(ExitError):
+            self._request([FakeResponse(503), FakeResponse(200)], "post")
+
+    def test_allowed_status_is_not_retried(self):
+        resp, sent, _ = self._request([FakeResponse(429), FakeResponse(200)], allow_status=(429,))
+        self.assertEqual((resp.status_code, sent), (429, 1))
+
+    def test_gives_up(self):
+        with raise_errors(), self.assertRaises(ExitError):
+            self._request([FakeResponse(500)] * 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import time
+import datetime
+import threading
+import unittest
+from unittest import mock
+
+from stepik.client import auth, token_manager
+
+
+class FakeUser:
+    def __init__(self, expires_in, refresh_token='refresh'):
+        self.client_id = 'id'
+        self.secret = 'secret'
+        self.access_token = 'token'
+        self.refresh_token = refresh_token
+        self.expiration = datetime.datetime.now() + datetime.timedelta(seconds=expires_in)
+
+    def sync_token(self):
+        pass
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(auth, 'refresh_client', return_value=True)
+        self.refresh_client = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(auth, 'auth_user_password')
+        self.auth_user_password = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_valid_token(self):
+        token_manager.ensure_token(FakeUser(3600))
+        self.refresh_client.assert_not_called()
+        self.auth_user_password.assert_not_called()
+
+    def test_refresh_before_expiry(self):
+        user = FakeUser(10)
+        token_manager.ensure_token(user)
+        self.refresh_client.assert_called_once_with(user)
+        self.auth_user_password.assert_not_called()
+
+    def test_reauthenticate_without_refresh_token(self):
+        user = FakeUser(-10, refresh_token=None)
+        token_manager.ensure_token(user)
+        self.refresh_client.assert_not_called()
+        self.auth_user_password.assert_called_once_with(user)
+
+    def test_renew_after_unauthorized(self):
+        user = FakeUser(3600)
+        token_manager.ensure_token(user)
+        self.assertIs(token_manager.renew_after_unauthorized(), user)
+        self.refresh_client.assert_called_once_with(user)
+
+    def test_renew_once_across_threads(self):
+        # a refresh token can only be used once, so threads that need a new token at the same time share one
+        user = FakeUser(10)
+
+        def refresh_client(user):
+            time.sleep(0.05)
+            user.expiration = datetime.datetime.now() + datetime.timedelta(hours=1)
+            return True
+
+        self.refresh_client.side_effect = refresh_client
+        threads = [threading.Thread(target=token_manager.ensure_token, args=(user,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.refresh_client.call_count, 1)
+        self.auth_user_password.assert_not_called()
+
+    def test_rejected_token_renewed_once(self):
+        user = FakeUser(3600)
+        token_manager.ensure_token(user)
+
+        def refresh_client(user):
+            user.access_token = 'new token'
+            return True
+
+        self.refresh_client.side_effect = refresh_client
+        token_manager.renew_after_unauthorized('token')
+        # another request was rejected with the old token, which has already been replaced
+        token_manager.renew_after_unauthorized('token')
+        self.assertEqual(self.refresh_client.call_count, 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import io
+import os
+import sys
+import unittest
+from unittest import mock
+
+from stepik import trace
+from stepik.client import session, stepikclient
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from fake_stepik import FakeCourse, FakeStepik
+
+
+class Test(unittest.TestCase):
+    def tearDown(self):
+        trace.stop()
+
+    def test_url_template(self):
+        self.assertEqual(trace.url_template("https://stepik.org/api/steps/123"), "/api/steps/{id}")
+        self.assertEqual(
+            trace.url_template("https://stepik.org/api/steps/?ids[]=1&ids[]=2&page=3"), "/api/steps/?ids[]&page"
+        )
+
+    def test_disabled(self):
+        trace.start()
+        trace.stop()
+        with trace.span('http', 'GET /api/steps/{id}') as span:
+            span['status'] = 200
+        self.assertEqual(trace.events, [])
+
+    def test_summary(self):
+        trace.start()
+        for cache in ('hit', 'miss', 'revalidated'):
+            with trace.span('cache', '/api/steps/{id}') as span:
+                span['cache'] = cache
+        with trace.span('http', 'GET /api/steps/{id}') as span:
+            span.update(status=200, bytes=10)
+        rows = trace.summary()
+        self.assertEqual(rows['cache', '/api/steps/{id}']['calls'], 3)
+        self.assertEqual(rows['cache', '/api/steps/{id}']['hits'], 2)
+        self.assertEqual(rows['cache', '/api/steps/{id}']['misses'], 1)
+        self.assertEqual(rows['http', 'GET /api/steps/{id}']['bytes'], 10)
+        self.assertEqual(rows['http', 'GET /api/steps/{id}']['statuses'], {200})
+        events = trace.chrome_trace()['traceEvents']
+        self.assertEqual(len(events), 4)
+        self.assertEqual(events[-1]['args'], {'status': 200, 'bytes': 10})
+
+    def test_connections(self):
+        # requests to the same host share one connection, and the report says so
+        server = FakeStepik(FakeCourse(sections=1, lessons=1, steps=3), latency=0).start()
+        self.addCleanup(server.stop)
+        previous = session.get_session()
+        self.addCleanup(session.set_session, previous)
+        session.set_session(session.create_session())
+        trace.start()
+        for step_id in server.course.steps:
+            stepikclient.get_request(server.host + "api/steps/{}".format(step_id)).close()
+        self.assertEqual(trace.connections(), {'requests': 3, 'opened': 1, 'reused': 2})
+        stderr = io.StringIO()
+        with mock.patch.object(sys, 'stderr', stderr):
+            trace.report()
+        self.assertIn("connections: 1 opened, 2 reused, for 3 requests", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 
-from utils import get_lesson_id, get_step_id, prepare_ids
+from utils import get_lesson_id, get_step_id, prepare_ids, pages_loader, exit_util, \
+    batched_entities_loader, batched_entities_iterator, all_entities_iterator
 
 SHORT_LINK = "https://stepik.org/lesson/12752/step/1"
 LARGE_LINK = "https://stepik.org/lesson/Что-такое-Java-откуда-она-взялась-и-зачем-нужна-12752/step/1"
@@ -47,5 +48,58 @@ class Test(unittest.TestCase):
         params = prepare_ids(ids)
         self.assertEqual(params, 'ids[]=123&ids[]=1&ids[]=5&ids[]=88')
 
+    def _fetch_pages(self, pages):
+        def fetch(page_index):
+            if page_index > pages:
+                exit_util("Something went wrong. A request returned 404")
+            return {'meta': {'has_next': page_index < pages}, 'items': [page_index]}
+        return fetch
+
+    def test_pages_loader_order(self):
+        pages = pages_loader(self._fetch_pages(9), workers=4)
+        self.assertEqual([page['items'][0] for page in pages], list(range(1, 10)))
+
+    def test_pages_loader_serial(self):
+        pages = pages_loader(self._fetch_pages(3), workers=1)
+        self.assertEqual([page['items'][0] for page in pages], [1, 2, 3])
+
+    def test_pages_loader_page_count(self):
+        pages = pages_loader(self._fetch_pages(3), page_count=lambda page: 3, workers=4)
+        self.assertEqual([page['items'][0] for page in pages], [1, 2, 3])
+
+    def test_batched_entities_loader_order(self):
+        requested = []
+
+        def getter(user, ids, page):
+            requested.append(list(ids))
+            return {'meta': {'has_next': False}, 'items': [{'id': i} for i in sorted(ids)]}
+
+        entity = lambda user, data: type('Entity', (), data)
+        entities = batched_entities_loader(getter, None, 'items', [5, 3, 9, 3, 1], entity, batch_size=2)
+        self.assertEqual([e.id for e in entities], [5, 3, 9, 3, 1])
+        self.assertEqual(requested, [[5, 3], [9, 1]])
+
+    def test_batched_entities_iterator_payloads(self):
+        def getter(user, ids, page):
+            return {'meta': {'has_next': False}, 'items': [{'id': i} for i in sorted(ids)]}
+
+        # without an entity class, the payloads are yielded as they arrive
+        entities = batched_entities_iterator(getter, None, 'items', [5, 3, 9, 3, 1], batch_size=2)
+        self.assertEqual(list(entities), [{'id': 3}, {'id': 5}, {'id': 1}, {'id': 9}])
+
+    def test_all_entities_iterator_streams(self):
+        requested = []
+
+        def getter(user, page):
+            requested.append(page)
+            return {'meta': {'has_next': page < 3}, 'items': [{'id': page * 10 + i} for i in range(2)]}
+
+        entity = lambda user, data: data['id']
+        entities = all_entities_iterator(getter, None, 'items', entity)
+        # the first entities are available as soon as the first page arrives
+        self.assertEqual(next(entities), 10)
+        self.assertEqual(requested, [1])
+        self.assertEqual(list(entities), [11, 20, 21, 30, 31])
+
 if __name__ == "__main__":
     unittest.main()